@@ -10,6 +10,10 @@ HTML_FOLDER = 'adminlte/html'
 HTML_DIR = ROOT_DIR + '/' + HTML_FOLDER
 FORK_DIR = ROOT_DIR + '/__fork'
 API_JSON = FORK_DIR + '/api.json'
+POLICY_CACHE = FORK_DIR + '/policy-cache.json'
+PROFILE_DIR = FORK_DIR + '/profile'
+CASSETTE = FORK_DIR + '/cassette.json.gz'
+STATE_DIR = FORK_DIR + '/state'
 
 GENERAL_CONF_PATH = SERVICE_DIR + '/general.reporter.json'
 
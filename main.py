@@ -13,7 +13,23 @@ filters = _cli_options['filters']
 
 DEBUG = True if debugFlag in _C.CLI_TRUE_KEYWORD_ARRAY or debugFlag is True else False
 # feedbackFlag = True if feedbackFlag in _C.CLI_TRUE_KEYWORD_ARRAY or feedbackFlag is True else False
-testmode = True if testmode in _C.CLI_TRUE_KEYWORD_ARRAY or testmode is True else False
+## --test True|<path> replays a cassette written by --record True|<path>, without touching AWS
+def cassetteOption(val):
+    if val is True or str(val).lower() in _C.CLI_TRUE_KEYWORD_ARRAY:
+        return _C.CASSETTE
+    if not val or str(val).lower() in ['false', 'no', 'n', '0']:
+        return None
+    return val
+
+cassettePath = cassetteOption(testmode)
+testmode = True if cassettePath else False
+recordPath = cassetteOption(_cli_options['record'])
+bulkmode = _cli_options['bulk']
+bulkmode = True if str(bulkmode).lower() in _C.CLI_TRUE_KEYWORD_ARRAY or bulkmode is True else False
+fullscan = _cli_options['full']
+fullscan = True if str(fullscan).lower() in _C.CLI_TRUE_KEYWORD_ARRAY or fullscan is True else False
+profiling = _cli_options['profiling']
+profiling = True if str(profiling).lower() in _C.CLI_TRUE_KEYWORD_ARRAY or profiling is True else False
 
 runmode = runmode if runmode in ['api-raw', 'api-full', 'report'] else 'report'
 
@@ -26,6 +42,8 @@ profile = _cli_options['profile']
 if profile:
     global PHPSDK_CRED_PROFILE
     PHPSDK_CRED_PROFILE = profile
+else:
+    profile = None
 
 _AWS_OPTIONS = {
     'signature_version': Config.AWS_SDK['signature_version']
@@ -33,12 +51,139 @@ _AWS_OPTIONS = {
 
 Config.init()
 Config.set('_AWS_OPTIONS', _AWS_OPTIONS)
+Config.set('profile', profile)
 oo = Config.get('_AWS_OPTIONS')
 
 # print(_cli_options['region'])
 
+import os
+import json
+
+from utils.Scheduler import Scheduler
+from utils.Policy import Policy
+from utils.PolicyCache import PolicyCache
+from utils.Profiler import Profiler
+from utils.ApiMetrics import ApiMetrics
+from utils.RateLimiter import RateLimiter
+from utils.Cassette import Cassette
+from utils.ScanState import ScanState
+from utils.Cache import Cache
+from utils.ClientFactory import ClientFactory
+from utils.Tools import _warn
+from services.Evaluator import Evaluator
+from services.Service import Service
+from services.Reporter import reporter
+from services.PageBuilder import PageBuilder
+
+services = Scheduler.parseList(_cli_options['services'])
+regions = Scheduler.parseList(_cli_options['region'])
+concurrency = int(_cli_options['concurrency'])
+
+Config.set('concurrency', concurrency)
+Config.set('workers', int(_cli_options['workers']))
+Config.set('bulk', bulkmode)
+Config.set('rules', Evaluator.parseRules(_cli_options['rules']))
+Config.set('tagFilter', Service.parseTagFilter(filters))
+RateLimiter.configure(_cli_options['ratelimit'])
+
+if profiling:
+    Profiler.enable()
+
+if testmode:
+    print("Replaying {} recorded API response(s) from {}".format(Cassette.load(cassettePath), cassettePath))
+    RateLimiter.enabled = False
+elif recordPath:
+    Cassette.startRecording()
+
+## a cassette must hold every call of the scan: caches kept on disk between runs would
+## answer some of them while recording, and the replay would then miss them
+cassetteActive = bool(testmode or recordPath)
+
+policyCachePath = _cli_options['policycache']
+if policyCachePath and cassetteActive:
+    _warn(" --policycache is ignored while recording or replaying a cassette")
+    policyCachePath = False
+if policyCachePath:
+    if str(policyCachePath).lower() in _C.CLI_TRUE_KEYWORD_ARRAY:
+        policyCachePath = _C.POLICY_CACHE
+    PolicyCache.load(policyCachePath)
+
+## Incremental scan: fingerprints are only cheap with the bulk IAM snapshot
+statePath = None
+if bulkmode and not cassetteActive:
+    try:
+        statePath = ScanState.getPath(_C.STATE_DIR, ScanState.getAccountId(ClientFactory.get('sts')))
+    except Exception as e:
+        _warn(" Unable to resolve the account id, incremental scan disabled: {}".format(e))
+
+if statePath:
+    ScanState.enabled = True
+    if not fullscan:
+        print("Previous scan state: {} resource(s)".format(ScanState.load(statePath)))
+
+reporters = {}
+def processService(service, regionObjs):
+    with Profiler.stage('reporting'):
+        reporters[service] = reporter(service).process(regionObjs).getSummary()
+        reporters[service].getDetails()
+
+scheduler = Scheduler(services, regions, concurrency)
+scanned = scheduler.run(processService)
+
+if policyCachePath:
+    PolicyCache.save(policyCachePath)
+
+if statePath:
+    ScanState.save(statePath)
+    ssStats = ScanState.getStats()
+    print("Incremental scan: {} resource(s) reused, {} evaluated".format(ssStats['reused'], ssStats['evaluated']))
+
+if recordPath and not testmode:
+    print("Recorded {} API response(s) to {}".format(Cassette.save(recordPath), recordPath))
+
+pcStats = PolicyCache.getStats()
+print("Managed policy cache: {} hit(s), {} miss(es), {} document(s)".format(pcStats['hit'], pcStats['miss'], pcStats['entries']))
+pStats = Policy.getStats()
+print("Policy documents: {} referenced, {} unique analysed, dedupe ratio {:.1%}".format(pStats['referenced'], pStats['analyzed'], pStats['dedupeRatio']))
+
+apiMetrics = ApiMetrics.getSummary()
+apiTotals = apiMetrics['totals']
+print("API calls: {} total, {} error(s), {} retries, {} throttled".format(apiTotals['calls'], apiTotals['errors'], apiTotals['retries'], apiTotals['throttles']))
+for row in apiMetrics['operations']:
+    if row['throttles'] or row['retries']:
+        print("  {}:{} ({}) {} call(s), {} retries, {} throttled, p50 {}s p99 {}s".format(row['service'], row['operation'], row['region'], row['calls'], row['retries'], row['throttles'], row['p50'], row['p99']))
+
+if runmode == 'report':
+    serviceCount = {}
+    for service, regionObjs in scanned.items():
+        serviceCount[service] = sum(len(objs) for objs in regionObjs.values())
+
+    with Profiler.stage('pagebuilding'):
+        for service, regionObjs in scanned.items():
+            pb = PageBuilder(service, reporters[service], serviceCount, list(regionObjs.keys()))
+            pb.buildPage()
+else:
+    os.makedirs(_C.FORK_DIR, exist_ok=True)
+    if runmode == 'api-raw':
+        apiOutput = scanned
+    else:
+        apiOutput = {}
+        for service, rep in reporters.items():
+            apiOutput[service] = {
+                'summary': rep.getCard(),
+                'detail': rep.getDetail()
+            }
+
+    apiOutput['_apiMetrics'] = apiMetrics
+    with open(_C.API_JSON, 'w') as f:
+        json.dump(apiOutput, f, default=str)
 
-import importlib.util
-ServiceClass = getattr(importlib.import_module('services.iam.Iam'), 'Iam')
-o = ServiceClass(_cli_options['region'])
-o.advise()
+if profiling:
+    summary = Profiler.save(_C.PROFILE_DIR)
+    print("Profile written to " + _C.PROFILE_DIR)
+    for stage, sec in summary['stages'].items():
+        print("  {:<14} {:>10.3f}s".format(stage, sec))
+    for chk in summary['checks'][:10]:
+        print("  {}::{} {:.3f}s in {} call(s), {} exception(s), {} API call(s)".format(chk['class'], chk['check'], chk['time'], chk['calls'], chk['exceptions'], chk['apiCalls']))
+    for name, stats in Cache.getStats().items():
+        print("  cache {:<16} {} hit(s), {} miss(es), {} evicted, {} expired, {} entries".format(name, stats['hit'], stats['miss'], stats['eviction'], stats['expired'], stats['size']))
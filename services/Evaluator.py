@@ -1,6 +1,102 @@
 # from abc import ABC
+import os
+import time
+import threading
+import traceback
+
+import constants as _C
+from utils.Config import Config
+from utils.Profiler import Profiler
+
+## Optional metadata for a _check* method:
+##   keys - reporter key(s) the check can emit
+##   cost - rough number of API calls it makes per resource (0 = pure)
+##   timeBased - result depends on the current date (age checks), so it is recomputed
+##               even when the resource itself has not changed since the last scan
+def check(keys=None, cost=1, timeBased=False):
+    def wrap(fn):
+        fn._checkMeta = {
+            'keys': keys or [],
+            'cost': cost,
+            'timeBased': timeBased
+        }
+        return fn
+    return wrap
 
 class Evaluator():
+    ## built once per subclass (see __init_subclass__), not per resource
+    _checks = []
+    _selected = {}
+    _errorLock = threading.Lock()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._checks = cls.buildCheckRegistry()
+        cls._selected = {}
+
+    @classmethod
+    def buildCheckRegistry(cls):
+        checks = []
+        for name in sorted(dir(cls)):
+            if name.startswith('__') or not name.startswith('_check'):
+                continue
+            fn = getattr(cls, name)
+            if not callable(fn):
+                continue
+
+            meta = getattr(fn, '_checkMeta', {})
+            checks.append({
+                'name': name,
+                'rule': name[6:].lower(),
+                'keys': meta.get('keys', []),
+                'cost': meta.get('cost', 1),
+                'timeBased': meta.get('timeBased', False),
+                'method': fn
+            })
+        return checks
+
+    ## --rules hasmfa,rolepolicy        run only these
+    ## --rules -rolepolicy,-userpolicy  run everything except these
+    ## --rules maxcost=1                skip checks declaring more than 1 API call
+    ## a rule matches the check name (without _check) or any reporter key it emits
+    @staticmethod
+    def parseRules(text):
+        rules = {'include': [], 'exclude': [], 'maxcost': None}
+        if not text:
+            return rules
+
+        for token in str(text).split(','):
+            token = token.strip().lower()
+            if not token:
+                continue
+            if token.startswith('maxcost='):
+                rules['maxcost'] = int(token[8:])
+            elif token[0] in ['-', '!']:
+                rules['exclude'].append(token[1:])
+            else:
+                rules['include'].append(token)
+        return rules
+
+    @classmethod
+    def getSelectedChecks(cls, rules):
+        cacheKey = repr(rules)
+        if cacheKey in cls._selected:
+            return cls._selected[cacheKey]
+
+        selected = []
+        for chk in cls._checks:
+            names = [chk['rule']] + [k.lower() for k in chk['keys']]
+            if rules['include'] and not any(n in rules['include'] for n in names):
+                continue
+            if any(n in rules['exclude'] for n in names):
+                continue
+            if rules['maxcost'] is not None and chk['cost'] > rules['maxcost']:
+                continue
+            selected.append(chk)
+
+        cls._selected[cacheKey] = selected
+        return selected
+
     def __init__(self):
         self.results = {}
         self.init()
@@ -8,33 +104,59 @@ class Evaluator():
     def init(self):
         self.classname = type(self).__name__
         
-    def run(self):
+    @classmethod
+    def getRules(cls):
+        rulePrefix = cls.__name__ + '::rules'
+        return Config.get(rulePrefix, None) or Config.get('rules', None) or cls.parseRules(None)
+        
+    def formatException(self, check, e):
+        return "[{}::{}] {}".format(self.classname, check, ''.join(traceback.format_exception(type(e), e, e.__traceback__)))
+        
+    ## Incremental scan: keep the previous results of an unchanged resource and only
+    ## recompute the time-based checks
+    def reuse(self, results):
+        timeBasedKeys = set()
+        for chk in self._checks:
+            if chk['timeBased']:
+                timeBasedKeys.update(chk['keys'])
+        
+        self.results = {k: v for k, v in results.items() if k not in timeBasedKeys}
+        self.run(timeBasedOnly=True)
+        
+    def run(self, timeBasedOnly=False):
         # global CONFIG
-        FORK_DIR = '.';
+        FORK_DIR = _C.FORK_DIR
         # servClass = self.classname.split('_')
-        servClass = self.classname
-        rulePrefix = servClass + '::rules'
-        rules = []
-        # rules = CONFIG.get(rulePrefix, [])
+        rules = self.getRules()
         
         ecnt = cnt = 0
         emsg = []
-        methods = [method for method in dir(self) if method.startswith('__') is False and method.startswith('_check') is True]
-        for method in methods:
-            if not rules or str.lower(method[6:]) in rules:
+        with Profiler.stage('evaluation'):
+            for chk in self.getSelectedChecks(rules):
+                if timeBasedOnly and not chk['timeBased']:
+                    continue
+                failed = False
+                start = time.perf_counter()
+                apiCalls = Profiler.apiCallCount()
                 try:
-                    # print('--- --- fn: ' + method)
-                    getattr(self, method)()
+                    # print('--- --- fn: ' + chk['name'])
+                    chk['method'](self)
                     cnt += 1
                 except Exception as e:
                     ecnt += 1
-                    # emsg.append(__formatException(e))
-            
+                    failed = True
+                    emsg.append(self.formatException(chk['name'], e))
+                
+                if Profiler.enabled:
+                    Profiler.recordCheck(self.classname, chk['name'], time.perf_counter() - start, failed, Profiler.apiCallCount() - apiCalls)
+        
+        self.exceptions = ecnt
         if emsg:
             #__warn("Catch: {} exception(s)".format(ecnt))
-            with open(FORK_DIR + '/error.txt', 'a+') as f:
-                f.write('\n\n'.join(emsg))
-                f.close()
+            with Evaluator._errorLock:
+                os.makedirs(FORK_DIR, exist_ok=True)
+                with open(FORK_DIR + '/error.txt', 'a+') as f:
+                    f.write('\n\n'.join(emsg) + '\n\n')
                 
         # scanned = CONFIG.get('scanned')
         # CONFIG.set('scanned', {
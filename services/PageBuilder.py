@@ -489,7 +489,7 @@ class PageBuilder:
             res = attrs['__affectedResources']
             for region in regions:
                 cnt = 0
-                if res[region]:
+                if res.get(region):
                     cnt = len(res[region])
                 dataSets.setdefault(region, []).append(cnt)
         
@@ -24,11 +24,8 @@ class reporter:
         for region, objs in serviceObjs.items():
             for identifier, results in objs.items():
                 self._process(region, identifier, results)
-                
-            if 'SERV' not in dashboard:
-                dashboard['SERV'] = {self.service: {region: {}}}
-                
-            dashboard['SERV'][self.service][region] = {'Total': len(objs), 'H': 0}
+
+            dashboard.setdefault('SERV', {}).setdefault(self.service, {})[region] = {'Total': len(objs), 'H': 0}
         return self
         
     def getDetail(self):
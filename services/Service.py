@@ -1,13 +1,22 @@
 from utils.Config import Config
+from utils.TagIndex import TagIndex
 
 class Service:
     _AWS_OPTIONS = {}
     RULESPREFIX = None
-    tags = []
+    tags = {}
 
     TAGS_SEPARATOR = '%'
     KEYVALUE_SEPARATOR = '='
     VALUES_SEPARATOR = ','
+    
+    ## region prefix -> partition, most specific first
+    PARTITIONS = [
+        ('cn-', 'aws-cn'),
+        ('us-gov-', 'aws-us-gov'),
+        ('us-isob-', 'aws-iso-b'),
+        ('us-iso-', 'aws-iso')
+    ]
 
     def __init__(self, region):
         global _Config
@@ -19,14 +28,65 @@ class Service:
         # __info("Scanning " + classname + suffix)
 
         self.RULESPREFIX = classname + '::rules'
+        ## Config hands out a copy, regions are scanned concurrently and must not share the same dict
         self._AWS_OPTIONS = Config.get("_AWS_OPTIONS", {'PlaceHolder': 'ok'})
         self._AWS_OPTIONS['region'] = region
+        self.region = region
+        self.tags = Config.get('tagFilter', None) or {}
         
         # if PHPSDK_CRED_PROVIDER is not None:
         #    self.__AWS_OPTIONS['credentials'] = PHPSDK_CRED_PROVIDER
         # elif PHPSDK_CRED_PROFILE is not None:
         #    self.__AWS_OPTIONS['profile'] = PHPSDK_CRED_PROFILE
         
+    ## --filters env=prod,staging%team=data => {'env': {'prod', 'staging'}, 'team': {'data'}}
+    ## every key has to match (AND), any of its values (OR); a key alone only requires the tag
+    @staticmethod
+    def parseTagFilter(text):
+        tagFilter = {}
+        if not text or text is True:
+            return tagFilter
+        
+        for cond in str(text).split(Service.TAGS_SEPARATOR):
+            if not cond.strip():
+                continue
+            key, _, values = cond.partition(Service.KEYVALUE_SEPARATOR)
+            vals = [v.strip() for v in values.split(Service.VALUES_SEPARATOR) if v.strip()]
+            tagFilter.setdefault(key.strip(), set()).update(vals)
+        return tagFilter
+    
+    ## tags as returned by AWS ([{'Key': .., 'Value': ..}]) or a plain dict
+    def resourceHasTags(self, tags):
+        if not self.tags:
+            return True
+        
+        if isinstance(tags, list):
+            tags = {t['Key']: t['Value'] for t in tags}
+        tags = tags or {}
+        
+        for key, values in self.tags.items():
+            if key not in tags:
+                return False
+            if values and tags[key] not in values:
+                return False
+        return True
+    
+    ## ARN partition of a region: 'cn-north-1' -> 'aws-cn', 'us-gov-west-1' -> 'aws-us-gov'
+    @staticmethod
+    def getPartition(region):
+        for prefix, partition in Service.PARTITIONS:
+            if region.startswith(prefix):
+                return partition
+        return 'aws'
+    
+    ## filter by ARN against the region's tag index, no per-resource tagging call
+    def arnHasTags(self, arn):
+        if not self.tags:
+            return True
+        
+        tags = TagIndex.get(self.region, self.tags).get(arn)
+        return tags is not None and self.resourceHasTags(tags)
+        
 if __name__ == "__main__":
     Config.init()
     Config.set('_AWS_OPTIONS', {'signature': 'ok'})
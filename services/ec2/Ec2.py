@@ -1 +1,135 @@
+import boto3
+import botocore
 
+import json
+import time
+
+from utils.Config import Config
+from utils.Tools import _pr
+from utils.WorkerPool import WorkerPool
+from utils.ClientFactory import ClientFactory
+from services.Service import Service
+from services.ec2.drivers.Ec2Instance import Ec2Instance
+from services.ec2.drivers.Ec2Volume import Ec2Volume
+from services.ec2.drivers.Ec2SecurityGroup import Ec2SecurityGroup
+from services.ec2.drivers.Ec2Eip import Ec2Eip
+from services.ec2.drivers.Ec2VolumeSnapshots import Ec2VolumeSnapshots
+from services.ec2 import SnapshotStats
+
+class Ec2(Service):
+    ## table: (describe method, call kwargs, result list, id field)
+    TABLES = {
+        'instances': ('describe_instances', {}, 'Reservations', None),
+        'volumes': ('describe_volumes', {}, 'Volumes', 'VolumeId'),
+        'securityGroups': ('describe_security_groups', {}, 'SecurityGroups', 'GroupId'),
+        'networkInterfaces': ('describe_network_interfaces', {}, 'NetworkInterfaces', 'NetworkInterfaceId'),
+        'addresses': ('describe_addresses', {}, 'Addresses', 'PublicIp')
+    }
+
+    ## describe_addresses has no paginator, everything is returned at once
+    UNPAGINATED = ['describe_addresses']
+
+    def __init__(self, region):
+        super().__init__(region)
+        self.ec2Client = ClientFactory.get('ec2', region)
+
+    def _describe(self, method, kwargs, listKey):
+        if method in self.UNPAGINATED:
+            yield from getattr(self.ec2Client, method)(**kwargs).get(listKey, [])
+            return
+
+        paginator = self.ec2Client.get_paginator(method)
+        for page in paginator.paginate(**kwargs):
+            yield from page.get(listKey, [])
+
+    ## self-owned snapshots can run into the hundreds of thousands, they are streamed into
+    ## per-volume accumulators instead of a table
+    def _harvestSnapshotStats(self):
+        return 'snapshotStats', SnapshotStats.aggregate(SnapshotStats.streamSnapshots(self.ec2Client), Ec2VolumeSnapshots.MAX_AGE_DAYS)
+
+    def _harvestTable(self, name):
+        if name == 'snapshotStats':
+            return self._harvestSnapshotStats()
+
+        method, kwargs, listKey, idField = self.TABLES[name]
+        if name == 'instances':
+            table = {}
+            for reservation in self._describe(method, kwargs, listKey):
+                for inst in reservation.get('Instances', []):
+                    table[inst['InstanceId']] = inst
+            return name, table
+
+        return name, {item[idField]: item for item in self._describe(method, kwargs, listKey)}
+
+    ## One paginated sweep per table plus the snapshot stream (all fetched concurrently),
+    ## then the indexes the cross-resource checks join on:
+    ##   instanceVolumes  InstanceId -> [VolumeId]
+    ##   sgEnis           GroupId    -> [NetworkInterfaceId]
+    ##   snapshotStats    VolumeId   -> SnapshotStats
+    def harvest(self):
+        snapshot = {}
+        pool = WorkerPool()
+        for name, table in pool.map(self._harvestTable, list(self.TABLES.keys()) + ['snapshotStats']):
+            snapshot[name] = table
+
+        instanceVolumes = {}
+        for vol in snapshot['volumes'].values():
+            for att in vol.get('Attachments', []):
+                instanceVolumes.setdefault(att['InstanceId'], []).append(vol['VolumeId'])
+
+        sgEnis = {}
+        for eni in snapshot['networkInterfaces'].values():
+            for group in eni.get('Groups', []):
+                sgEnis.setdefault(group['GroupId'], []).append(eni['NetworkInterfaceId'])
+
+        snapshot['instanceVolumes'] = instanceVolumes
+        snapshot['sgEnis'] = sgEnis
+        return snapshot
+
+    ## tags come with the describe output, no tagging call needed
+    def getResources(self, table):
+        return [item for item in self.snapshot[table].values() if self.resourceHasTags(item.get('Tags', []))]
+
+    def advise(self):
+        objs = {}
+
+        print('... (EC2) harvesting ' + self.region)
+        self.snapshot = self.harvest()
+
+        for inst in self.getResources('instances'):
+            obj = Ec2Instance(inst, self.snapshot)
+            obj.run()
+            objs['Instance::' + inst['InstanceId']] = obj.getInfo()
+
+        for vol in self.getResources('volumes'):
+            obj = Ec2Volume(vol, self.snapshot)
+            obj.run()
+            objs['Volume::' + vol['VolumeId']] = obj.getInfo()
+
+        for sg in self.getResources('securityGroups'):
+            obj = Ec2SecurityGroup(sg, self.snapshot)
+            obj.run()
+            objs['SecurityGroup::' + sg['GroupId']] = obj.getInfo()
+
+        for addr in self.getResources('addresses'):
+            obj = Ec2Eip(addr, self.snapshot)
+            obj.run()
+            objs['EIP::' + addr['PublicIp']] = obj.getInfo()
+
+        ## one entry per source volume, and only when there is something to report;
+        ## with --filters the source volume must still exist and match
+        for volumeId, stats in self.snapshot['snapshotStats'].items():
+            if self.tags and not self.resourceHasTags(self.snapshot['volumes'].get(volumeId, {}).get('Tags', [])):
+                continue
+            obj = Ec2VolumeSnapshots(volumeId, stats, self.snapshot)
+            obj.run()
+            if obj.getInfo():
+                objs['Snapshots::' + volumeId] = obj.getInfo()
+
+        return objs
+
+if __name__ == "__main__":
+    Config.init()
+    o = Ec2('ap-southeast-1')
+    out = o.advise()
+    _pr(out)
@@ -0,0 +1,190 @@
+import bisect
+import ipaddress
+
+## Security group rules flattened to one (protocol, CIDR, port range) tuple per source,
+## and indexed so containment ("is this rule already allowed by others?") is answered with
+## hash lookups over the CIDR's supernets plus a bisect on merged port intervals,
+## instead of comparing every pair of rules.
+PROTOCOL_NAMES = {
+    '6': 'tcp',
+    '17': 'udp',
+    '1': 'icmp',
+    '58': 'icmpv6'
+}
+
+ALL_PORTS = (0, 65535)
+
+## FromPort/ToPort are ports only for these, 'all traffic' includes every port
+PORT_PROTOCOLS = ['tcp', 'udp', '-1']
+
+## for ICMP they are the type & code (-1 = any): encoded as type * 256 + code so "type 8,
+## any code" is the interval of every code of type 8 and containment still works
+ICMP_PROTOCOLS = ['icmp', 'icmpv6']
+
+class Rule:
+    __slots__ = ('direction', 'protocol', 'network', 'portFrom', 'portTo')
+
+    def __init__(self, direction, protocol, network, portFrom, portTo):
+        self.direction = direction
+        self.protocol = protocol
+        self.network = network
+        self.portFrom = portFrom
+        self.portTo = portTo
+
+    def isWorld(self):
+        return self.network.prefixlen == 0
+
+    def hasPortIn(self, sortedPorts):
+        if self.protocol not in PORT_PROTOCOLS:
+            return False
+        ind = bisect.bisect_left(sortedPorts, self.portFrom)
+        return ind < len(sortedPorts) and sortedPorts[ind] <= self.portTo
+
+    def __str__(self):
+        if self.protocol in ICMP_PROTOCOLS and (self.portFrom, self.portTo) != ALL_PORTS:
+            icmpType, code = divmod(self.portFrom, 256)
+            code = 'all' if self.portTo - self.portFrom == 255 else code
+            return "{} type {} code {} {}".format(self.protocol, icmpType, code, self.network)
+
+        ports = 'all' if (self.portFrom, self.portTo) == ALL_PORTS else str(self.portFrom) if self.portFrom == self.portTo else "{}-{}".format(self.portFrom, self.portTo)
+        protocol = 'all' if self.protocol == '-1' else self.protocol
+        return "{} {} {}".format(protocol, ports, self.network)
+
+def _icmpTypes(perm):
+    icmpType = perm.get('FromPort', -1)
+    code = perm.get('ToPort', -1)
+    if icmpType is None or icmpType < 0:
+        return ALL_PORTS
+    if code is None or code < 0:
+        return icmpType * 256, icmpType * 256 + 255
+    return icmpType * 256 + code, icmpType * 256 + code
+
+def _ports(perm, protocol):
+    if protocol in ICMP_PROTOCOLS:
+        return _icmpTypes(perm)
+    ## all traffic, or a protocol without ports (e.g. ESP, GRE): the whole protocol is allowed
+    if protocol == '-1' or protocol not in PORT_PROTOCOLS:
+        return ALL_PORTS
+
+    portFrom = perm.get('FromPort', -1)
+    portTo = perm.get('ToPort', -1)
+    if portFrom is None or portFrom < 0:
+        return ALL_PORTS
+    if portTo is None or portTo < 0:
+        portTo = portFrom
+    return portFrom, portTo
+
+def normalize(sg):
+    rules = []
+    for direction, key in [('ingress', 'IpPermissions'), ('egress', 'IpPermissionsEgress')]:
+        for perm in sg.get(key, []):
+            protocol = str(perm.get('IpProtocol', '-1')).lower()
+            protocol = PROTOCOL_NAMES.get(protocol, protocol)
+            portFrom, portTo = _ports(perm, protocol)
+
+            cidrs = [r['CidrIp'] for r in perm.get('IpRanges', [])] + [r['CidrIpv6'] for r in perm.get('Ipv6Ranges', [])]
+            for cidr in cidrs:
+                rules.append(Rule(direction, protocol, ipaddress.ip_network(cidr, strict=False), portFrom, portTo))
+    return rules
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [start for start, _ in merged], [end for _, end in merged]
+
+## ranges covered by at least two of the intervals, as _merge(); every point of an interval
+## in these is also allowed by another interval
+def _overlaps(intervals):
+    events = {}
+    for start, end in intervals:
+        events[start] = events.get(start, 0) + 1
+        events[end + 1] = events.get(end + 1, 0) - 1
+
+    ranges = []
+    depth = 0
+    opened = None
+    for pos in sorted(events):
+        depth += events[pos]
+        if depth >= 2 and opened is None:
+            opened = pos
+        elif depth < 2 and opened is not None:
+            ranges.append((opened, pos - 1))
+            opened = None
+    return _merge(ranges)
+
+class RuleIndex:
+    def __init__(self, rules):
+        self.rules = rules
+
+        ## (direction, protocol, version, network int, prefixlen) -> rules on exactly that CIDR
+        exact = {}
+        ## (direction, protocol, version) -> prefix lengths in use, supernets are only
+        ## looked up for those
+        self._prefixlens = {}
+        for rule in rules:
+            exact.setdefault(self._key(rule, rule.protocol, rule.network.prefixlen), []).append(rule)
+            self._prefixlens.setdefault((rule.direction, rule.protocol, rule.network.version), set()).add(rule.network.prefixlen)
+        self._prefixlens = {k: sorted(v) for k, v in self._prefixlens.items()}
+
+        ## merged port intervals per exact CIDR, for supernet lookups
+        self._ports = {key: _merge([(r.portFrom, r.portTo) for r in group]) for key, group in exact.items()}
+
+        ## on the same CIDR a rule is redundant when the union of the other rules covers its
+        ## ports, i.e. every port is also in a second interval; of identical rules only
+        ## the first one is kept
+        self._sameCidrCovered = set()
+        for group in exact.values():
+            distinct = {}
+            for rule in group:
+                if (rule.portFrom, rule.portTo) in distinct:
+                    self._sameCidrCovered.add(id(rule))
+                else:
+                    distinct[(rule.portFrom, rule.portTo)] = rule
+
+            starts, ends = _overlaps(distinct.keys())
+            for (portFrom, portTo), rule in distinct.items():
+                ind = bisect.bisect_right(starts, portFrom) - 1
+                if ind >= 0 and ends[ind] >= portTo:
+                    self._sameCidrCovered.add(id(rule))
+
+    ## key of the rule's network truncated to prefixlen (i.e. its supernet)
+    @staticmethod
+    def _key(rule, protocol, prefixlen):
+        network = rule.network
+        hostBits = network.max_prefixlen - prefixlen
+        address = (int(network.network_address) >> hostBits) << hostBits
+        return (rule.direction, protocol, network.version, address, prefixlen)
+
+    def _portsCovered(self, key, rule):
+        ports = self._ports.get(key)
+        if ports is None:
+            return False
+        starts, ends = ports
+        ind = bisect.bisect_right(starts, rule.portFrom) - 1
+        return ind >= 0 and ends[ind] >= rule.portTo
+
+    ## allowed entirely by other rules of the group: same or wider CIDR, same protocol
+    ## or 'all', and ports covered
+    def isRedundant(self, rule):
+        if id(rule) in self._sameCidrCovered:
+            return True
+
+        prefixlen = rule.network.prefixlen
+        protocols = [rule.protocol] if rule.protocol == '-1' else [rule.protocol, '-1']
+        for protocol in protocols:
+            for supernetLen in self._prefixlens.get((rule.direction, protocol, rule.network.version), []):
+                if supernetLen > prefixlen:
+                    break
+                ## same CIDR and same protocol is handled above
+                if supernetLen == prefixlen and protocol == rule.protocol:
+                    continue
+                if self._portsCovered(self._key(rule, protocol, supernetLen), rule):
+                    return True
+        return False
+
+    def getRedundantRules(self):
+        return [rule for rule in self.rules if self.isRedundant(rule)]
@@ -0,0 +1,52 @@
+import datetime
+
+## EBS snapshots are streamed page by page and folded into one fixed-size accumulator per
+## source volume; individual snapshots are never kept, so memory depends on the number of
+## volumes, not on years of automated backups.
+PAGE_SIZE = 1000
+
+## VolumeId of snapshots that were copied or imported, not taken from a volume of this account
+UNKNOWN_VOLUME = 'vol-ffffffff'
+
+class SnapshotStats:
+    __slots__ = ('count', 'size', 'oldCount', 'oldSize', 'oldest', 'newest')
+
+    def __init__(self):
+        self.count = 0
+        self.size = 0
+        self.oldCount = 0
+        self.oldSize = 0
+        self.oldest = None
+        self.newest = None
+
+    def add(self, snap, cutoff):
+        started = snap['StartTime']
+        size = snap.get('VolumeSize', 0)
+
+        self.count += 1
+        self.size += size
+        if started < cutoff:
+            self.oldCount += 1
+            self.oldSize += size
+        if self.oldest is None or started < self.oldest:
+            self.oldest = started
+        if self.newest is None or started > self.newest:
+            self.newest = started
+
+def streamSnapshots(ec2Client):
+    paginator = ec2Client.get_paginator('describe_snapshots')
+    for page in paginator.paginate(OwnerIds=['self'], PaginationConfig={'PageSize': PAGE_SIZE}):
+        yield from page.get('Snapshots', [])
+
+## {VolumeId: SnapshotStats}, snapshots taken before maxAgeDays count as old
+def aggregate(snapshots, maxAgeDays):
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=maxAgeDays)
+
+    stats = {}
+    for snap in snapshots:
+        volumeId = snap.get('VolumeId') or UNKNOWN_VOLUME
+        acc = stats.get(volumeId)
+        if acc is None:
+            acc = stats[volumeId] = SnapshotStats()
+        acc.add(snap, cutoff)
+    return stats
@@ -0,0 +1,21 @@
+from services.Evaluator import Evaluator, check
+
+class Ec2Eip(Evaluator):
+    def __init__(self, address, snapshot):
+        super().__init__()
+        self.address = address
+        self.snapshot = snapshot
+
+        self.init()
+
+    ## charged when not associated, or associated with an instance that is not running
+    @check(keys=['EIPIdle'], cost=0)
+    def _checkIdle(self):
+        if not self.address.get('AssociationId'):
+            self.results['EIPIdle'] = [-1, 'Not associated']
+            return
+
+        instanceId = self.address.get('InstanceId')
+        inst = self.snapshot['instances'].get(instanceId) if instanceId else None
+        if inst is not None and inst.get('State', {}).get('Name') != 'running':
+            self.results['EIPIdle'] = [-1, "{} is {}".format(instanceId, inst['State']['Name'])]
@@ -0,0 +1,23 @@
+from services.Evaluator import Evaluator, check
+
+## checks read the region snapshot built by Ec2.harvest(), no API call
+class Ec2Instance(Evaluator):
+    def __init__(self, instance, snapshot):
+        super().__init__()
+        self.instance = instance
+        self.snapshot = snapshot
+
+        self.init()
+
+    ## a stopped instance is not billed, its EBS volumes still are
+    @check(keys=['EC2StoppedWithEBS'], cost=0)
+    def _checkStoppedWithVolumes(self):
+        if self.instance.get('State', {}).get('Name') != 'stopped':
+            return
+
+        volumeIds = self.snapshot['instanceVolumes'].get(self.instance['InstanceId'], [])
+        if not volumeIds:
+            return
+
+        size = sum(self.snapshot['volumes'][v].get('Size', 0) for v in volumeIds if v in self.snapshot['volumes'])
+        self.results['EC2StoppedWithEBS'] = [-1, "{} volume(s), {} GiB".format(len(volumeIds), size)]
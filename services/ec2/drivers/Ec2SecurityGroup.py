@@ -0,0 +1,67 @@
+from services.Evaluator import Evaluator, check
+from services.ec2 import SecurityGroupRules
+
+class Ec2SecurityGroup(Evaluator):
+    ## SSH, Telnet, RDP, WinRM
+    ADMIN_PORTS = [22, 23, 3389, 5985, 5986]
+    ## anything wider than these (but not the whole internet) is reported as broad
+    MIN_PREFIXLEN = {4: 16, 6: 48}
+
+    def __init__(self, sg, snapshot):
+        super().__init__()
+        self.sg = sg
+        self.snapshot = snapshot
+        self.rules = SecurityGroupRules.normalize(sg)
+
+        self.init()
+
+    def getIngressRules(self):
+        return [rule for rule in self.rules if rule.direction == 'ingress']
+
+    ## default groups cannot be deleted, not reported
+    @check(keys=['SGUnused'], cost=0)
+    def _checkUnused(self):
+        if self.sg.get('GroupName') == 'default':
+            return
+
+        if not self.snapshot['sgEnis'].get(self.sg['GroupId']):
+            self.results['SGUnused'] = [-1, self.sg.get('GroupName')]
+
+    @check(keys=['SGAdminPortOpenToWorld'], cost=0)
+    def _checkAdminPortExposure(self):
+        exposed = [str(rule) for rule in self.getIngressRules() if rule.isWorld() and rule.hasPortIn(self.ADMIN_PORTS)]
+        if exposed:
+            self.results['SGAdminPortOpenToWorld'] = [-1, '<br>'.join(exposed)]
+
+    @check(keys=['SGBroadCidr'], cost=0)
+    def _checkBroadCidr(self):
+        broad = []
+        for rule in self.getIngressRules():
+            if not rule.isWorld() and rule.network.prefixlen < self.MIN_PREFIXLEN[rule.network.version]:
+                broad.append(str(rule))
+
+        if broad:
+            self.results['SGBroadCidr'] = [-1, '<br>'.join(broad)]
+
+    @check(keys=['SGRedundantRule'], cost=0)
+    def _checkRedundantRules(self):
+        redundant = SecurityGroupRules.RuleIndex(self.rules).getRedundantRules()
+        if redundant:
+            self.results['SGRedundantRule'] = [-1, '<br>'.join(rule.direction + ' ' + str(rule) for rule in redundant)]
+
+    ## group of this account that no longer exists (peered / cross-account groups are skipped)
+    @check(keys=['SGStaleReference'], cost=0)
+    def _checkStaleReferences(self):
+        stale = []
+        for key in ['IpPermissions', 'IpPermissionsEgress']:
+            for perm in self.sg.get(key, []):
+                for pair in perm.get('UserIdGroupPairs', []):
+                    if pair.get('VpcPeeringConnectionId'):
+                        continue
+                    if pair.get('UserId') and pair['UserId'] != self.sg.get('OwnerId'):
+                        continue
+                    if pair.get('GroupId') not in self.snapshot['securityGroups'] and pair.get('GroupId') not in stale:
+                        stale.append(pair.get('GroupId'))
+
+        if stale:
+            self.results['SGStaleReference'] = [-1, '<br>'.join(stale)]
@@ -0,0 +1,22 @@
+from services.Evaluator import Evaluator, check
+
+class Ec2Volume(Evaluator):
+    def __init__(self, volume, snapshot):
+        super().__init__()
+        self.volume = volume
+        self.snapshot = snapshot
+
+        self.init()
+
+    @check(keys=['EBSUnattached'], cost=0)
+    def _checkUnattached(self):
+        if self.volume.get('State') == 'available':
+            self.results['EBSUnattached'] = [-1, "{} GiB".format(self.volume.get('Size', 0))]
+
+    @check(keys=['EBSNoSnapshot'], cost=0)
+    def _checkHasSnapshot(self):
+        if self.volume.get('State') != 'in-use':
+            return
+
+        if self.volume['VolumeId'] not in self.snapshot['snapshotStats']:
+            self.results['EBSNoSnapshot'] = [-1, 'No snapshot']
@@ -0,0 +1,27 @@
+from services.Evaluator import Evaluator, check
+from services.ec2 import SnapshotStats
+
+## evaluates the snapshot accumulator of one source volume (see SnapshotStats)
+class Ec2VolumeSnapshots(Evaluator):
+    MAX_AGE_DAYS = 365
+
+    def __init__(self, volumeId, stats, snapshot):
+        super().__init__()
+        self.volumeId = volumeId
+        self.stats = stats
+        self.snapshot = snapshot
+
+        self.init()
+
+    @check(keys=['EBSSnapshotOld'], cost=0, timeBased=True)
+    def _checkOldSnapshots(self):
+        if self.stats.oldCount:
+            self.results['EBSSnapshotOld'] = [-1, "{} snapshot(s), {} GiB, oldest {}".format(self.stats.oldCount, self.stats.oldSize, self.stats.oldest.date())]
+
+    @check(keys=['EBSSnapshotOrphan'], cost=0)
+    def _checkDeletedVolume(self):
+        if self.volumeId == SnapshotStats.UNKNOWN_VOLUME:
+            return
+
+        if self.volumeId not in self.snapshot['volumes']:
+            self.results['EBSSnapshotOrphan'] = [-1, "{} snapshot(s), {} GiB, latest {}".format(self.stats.count, self.stats.size, self.stats.newest.date())]
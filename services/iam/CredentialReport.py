@@ -0,0 +1,117 @@
+import io
+import csv
+import time
+import datetime
+
+import botocore
+
+## One row of the IAM credential report.
+## Booleans and timestamps are parsed once, the report's own markers
+## ('N/A', 'no_information', 'not_supported') are kept as-is.
+class CredentialReportUser:
+    __slots__ = (
+        'user', 'arn', 'user_creation_time',
+        'password_enabled', 'password_last_used', 'password_last_changed', 'password_next_rotation',
+        'mfa_active',
+        'access_key_1_active', 'access_key_1_last_rotated', 'access_key_1_last_used_date',
+        'access_key_1_last_used_region', 'access_key_1_last_used_service',
+        'access_key_2_active', 'access_key_2_last_rotated', 'access_key_2_last_used_date',
+        'access_key_2_last_used_region', 'access_key_2_last_used_service',
+        'cert_1_active', 'cert_1_last_rotated', 'cert_2_active', 'cert_2_last_rotated'
+    )
+
+    BOOL_FIELDS = [
+        'password_enabled', 'mfa_active',
+        'access_key_1_active', 'access_key_2_active',
+        'cert_1_active', 'cert_2_active'
+    ]
+
+    DATE_FIELDS = [
+        'user_creation_time', 'password_last_used', 'password_last_changed', 'password_next_rotation',
+        'access_key_1_last_rotated', 'access_key_1_last_used_date',
+        'access_key_2_last_rotated', 'access_key_2_last_used_date',
+        'cert_1_last_rotated', 'cert_2_last_rotated'
+    ]
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, fields.get(field))
+
+    ## dict-style access, drivers were written against the old list of dict
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    @staticmethod
+    def parseValue(field, value):
+        if field in CredentialReportUser.BOOL_FIELDS:
+            if value == 'true':
+                return True
+            if value == 'false':
+                return False
+            return value
+
+        if field in CredentialReportUser.DATE_FIELDS:
+            try:
+                return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                return value
+
+        return value
+
+class CredentialReport:
+    NOT_READY_CODES = ['ReportNotPresent', 'ReportExpired', 'ReportInProgress']
+
+    def __init__(self, iamClient, timeout=120, maxDelay=8):
+        self.iamClient = iamClient
+        self.timeout = timeout
+        self.maxDelay = maxDelay
+
+    ## generate_credential_report is idempotent: it starts a report when needed and
+    ## tells whether it is COMPLETE, poll it with exponential backoff until then
+    def waitForReport(self):
+        deadline = time.time() + self.timeout
+        delay = 0.5
+        while True:
+            resp = self.iamClient.generate_credential_report()
+            if resp.get('State') == 'COMPLETE':
+                return
+
+            if time.time() + delay > deadline:
+                raise TimeoutError('IAM credential report not ready after {}s'.format(self.timeout))
+
+            time.sleep(delay)
+            delay = min(delay * 2, self.maxDelay)
+
+    def fetch(self):
+        try:
+            return self.iamClient.get_credential_report()
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] not in self.NOT_READY_CODES:
+                raise
+
+        print('Generating IAM Credential Report...')
+        self.waitForReport()
+        return self.iamClient.get_credential_report()
+
+    @staticmethod
+    def parse(content):
+        if isinstance(content, bytes):
+            content = content.decode('UTF-8')
+
+        reader = csv.reader(io.StringIO(content))
+        fields = next(reader, None)
+        if not fields:
+            return
+
+        parseValue = CredentialReportUser.parseValue
+        for row in reader:
+            if not row:
+                continue
+            yield CredentialReportUser(**{f: parseValue(f, v) for f, v in zip(fields, row)})
+
+    def users(self):
+        results = self.fetch()
+        return self.parse(results.get('Content'))
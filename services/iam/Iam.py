@@ -6,106 +6,153 @@ import time
 
 from utils.Config import Config
 from utils.Tools import _pr
+from utils.WorkerPool import WorkerPool
+from utils.ScanState import ScanState
+from utils.ClientFactory import ClientFactory
 from services.Service import Service
 from services.iam.drivers.IamRole import IamRole
 from services.iam.drivers.IamGroup import IamGroup
 from services.iam.drivers.IamUser import IamUser
+from services.iam.drivers.IamUserBatch import IamUserBatch
 from services.iam.drivers.IamAccount import IamAccount
+from services.iam.CredentialReport import CredentialReport
 
 class Iam(Service):
+    USER_BATCH_SIZE = 1000
+    
     def __init__(self, region):
         super().__init__(region)
         # self._AWS_OPTIONS['version'] = Config.AWS_SDK['IAMCLIENT_VERS']
         # self.iamClient = IamClient(self.__AWS_OPTIONS)
-        self.iamClient = boto3.client('iam')
+        self.iamClient = ClientFactory.get('iam')
+        self.snapshot = None
     
-    def getGroups(self):
-        arr = []
-        results = self.iamClient.list_groups()
-        arr = results.get('Groups')
+    ## Bulk mode: one paginated sweep returns users, groups, roles, their inline documents,
+    ## attached/managed policy versions and memberships, so drivers need no per-entity calls
+    def getAuthorizationDetails(self):
+        snapshot = {
+            'users': {},
+            'groups': {},
+            'roles': {},
+            'policies': {},
+            'groupMembers': {}
+        }
         
-        while results.get('Marker') is not None:
-            results = self.iamClient.list_groups(
-                Marker = results.get('Marker')
-            )
-            arr = arr + results.get('Groups')
+        paginator = self.iamClient.get_paginator('get_account_authorization_details')
+        pages = paginator.paginate(Filter=['User', 'Group', 'Role', 'LocalManagedPolicy', 'AWSManagedPolicy'])
+        for page in pages:
+            for user in page.get('UserDetailList', []):
+                snapshot['users'][user['UserName']] = user
+                for group in user.get('GroupList', []):
+                    snapshot['groupMembers'].setdefault(group, []).append(user['UserName'])
+            
+            for group in page.get('GroupDetailList', []):
+                snapshot['groups'][group['GroupName']] = group
             
-        return arr
+            for role in page.get('RoleDetailList', []):
+                snapshot['roles'][role['RoleName']] = role
+            
+            for policy in page.get('Policies', []):
+                ## AWS managed policies are returned whether used or not, keep attached ones only
+                if policy.get('AttachmentCount', 0) == 0:
+                    continue
+                
+                doc = None
+                for version in policy.get('PolicyVersionList', []):
+                    if version.get('IsDefaultVersion'):
+                        doc = version.get('Document')
+                
+                snapshot['policies'][policy['Arn']] = {
+                    'PolicyName': policy['PolicyName'],
+                    'DefaultVersionId': policy['DefaultVersionId'],
+                    'Document': doc
+                }
+        
+        return snapshot
+    
+    ## list functions are generators over boto3 paginators: entities are yielded page by page
+    ## into the worker pool, so evaluating one page overlaps fetching the next and memory
+    ## stays bounded by the page size
+    def getGroups(self):
+        if self.snapshot is not None:
+            yield from self.snapshot['groups'].values()
+            return
+        
+        paginator = self.iamClient.get_paginator('list_groups')
+        for page in paginator.paginate():
+            yield from page.get('Groups', [])
     
     def getRoles(self):
-        arr = []
-        results = self.iamClient.list_roles()
-        for v in results.get('Roles'):
-            if (v['Path'] != '/service-role/' and v['Path'][0:18] != '/aws-service-role/') and (self._roleFilterByName(v['RoleName'])):
-                arr.append(v)
-                
-        while results.get('Marker') is not None:
-            results = self.iamClient.list_roles(Marker=results.get('Marker'))
-            for v in results.get('Roles'):
+        paginator = self.iamClient.get_paginator('list_roles')
+        for page in paginator.paginate():
+            for v in page.get('Roles', []):
                 if (v['Path'] != '/service-role/' and v['Path'][0:18] != '/aws-service-role/') and (self._roleFilterByName(v['RoleName'])):
-                    arr.append(v)
-        
-        return arr
+                    yield v
         
     def getUsers(self):
-        arr = []
-        try:
-            results = self.iamClient.get_credential_report()
-        except botocore.exceptions.ClientError as e:
-            if e.response['Error']['Code'] == 'ReportNotPresent':
-                resp = self.iamClient.generate_credential_report()
-                print('Generating IAM Credential Report...')
-                time.sleep(1)
-                
-                results = self.iamClient.get_credential_report()
-        
-        rows = results.get('Content')
-        rows = rows.decode('UTF-8')
-        
-        row = rows.split("\n")
+        return CredentialReport(self.iamClient).users()
         
-        fields = row[0].split(',')
-        del row[0]
-        for temp in row:
-            arr.append(dict(zip(fields, temp.split(','))))
+    def _chunks(self, items, size):
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    ## With a scan state, an entity whose fingerprint matches the previous run keeps its
+    ## findings and only the time-based checks are evaluated again
+    def _inspect(self, job):
+        Driver, entity, label = job
+        kind = Driver.__name__[3:]
+        obj = Driver(entity, self.iamClient, self.snapshot)
         
-        return arr
+        fingerprint = obj.getFingerprint() if ScanState.enabled else None
+        cached = ScanState.get('iam', kind + '::' + label, fingerprint) if fingerprint else None
+        if cached is not None:
+            print('... (IAM::' + kind + ') unchanged, reusing ' + label)
+            obj.reuse(cached)
+        else:
+            print('... (IAM::' + kind + ') inspecting ' + label)
+            obj.run()
         
+        if fingerprint and obj.exceptions == 0:
+            ScanState.set('iam', kind + '::' + label, fingerprint, obj.getInfo(), cached is not None)
+        return entity, obj.getInfo()
+    
     def advise(self):
         objs = {}
+        pool = WorkerPool()
+        
+        if Config.get('bulk', False) == True:
+            print('... (IAM) harvesting account authorization details')
+            self.snapshot = self.getAuthorizationDetails()
         
         print('... (IAM:Account) inspecting')
         obj = IamAccount(None, self.iamClient)
         obj.run()
         objs['Account::Config'] = obj.getInfo()
         
-        users = self.getUsers()
-        for user in users:
-            print('... (IAM::User) inspecting ' + user['user'])
-            obj = IamUser(user, self.iamClient)
-            obj.run()
+        ## Drivers are evaluated concurrently, results come back in input order
+        ## so the output keys stay deterministic
+        for users in self._chunks(self.getUsers(), self.USER_BATCH_SIZE):
+            batch = IamUserBatch(users)
+            batch.run()
             
-            identifier = "<b>root_id</b>" if user['user'] == "<root_account>" else user['user']
-            objs['User::' + identifier] = obj.getInfo()
-            del obj
+            jobs = ((IamUser, user, user['user']) for user in users)
+            for (user, info), batchInfo in zip(pool.map(self._inspect, jobs), batch.getInfo()):
+                identifier = "<b>root_id</b>" if user['user'] == "<root_account>" else user['user']
+                objs['User::' + identifier] = {**batchInfo, **info}
         
-        roles = self.getRoles()
-        for role in roles:
-            print('... (IAM::Role) inspecting ' + role['RoleName'])
-            obj = IamRole(role, self.iamClient)
-            obj.run()
-            
-            objs['Role::' + role['RoleName']] = obj.getInfo()
-            del obj
+        jobs = ((IamRole, role, role['RoleName']) for role in self.getRoles())
+        for role, info in pool.map(self._inspect, jobs):
+            objs['Role::' + role['RoleName']] = info
         
-        groups = self.getGroups()
-        for group in groups:
-            print('... (IAM::Group) inspecting ' + group['GroupName'])
-            obj = IamGroup(group, self.iamClient)
-            obj.run()
-            
-            objs['Group::' + group['GroupName']] = obj.getInfo()
-            del obj
+        jobs = ((IamGroup, group, group['GroupName']) for group in self.getGroups())
+        for group, info in pool.map(self._inspect, jobs):
+            objs['Group::' + group['GroupName']] = info
         
         return objs
     
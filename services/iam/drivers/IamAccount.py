@@ -4,6 +4,7 @@ import botocore
 import datetime
 from dateutil.tz import tzlocal
 
+from services.Evaluator import check
 from .IamCommon import IamCommon
  
 class IamAccount(IamCommon):
@@ -40,6 +41,7 @@ class IamAccount(IamCommon):
                 
         return score
         
+    @check(keys=['passwordPolicy', 'passwordPolicyWeak'], cost=1)
     def _checkPasswordPolicy(self):
         try:
             resp = self.iamClient.get_account_password_policy()
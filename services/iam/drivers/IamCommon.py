@@ -1,13 +1,51 @@
-import urllib.parse
-from datetime import date
+import math
+import datetime
 
 import boto3
 
 from utils.Config import Config
 from utils.Policy import Policy
+from utils.PolicyCache import PolicyCache
+from utils.ScanState import ScanState
 from services.Evaluator import Evaluator
 
 class IamCommon(Evaluator):
+    snapshot = None
+    
+    ## entity detail from Iam.getAuthorizationDetails(), None when not running in bulk mode
+    def getSnapshotEntity(self, kind, name):
+        if not self.snapshot:
+            return None
+        return self.snapshot[kind].get(name)
+    
+    ## Incremental scans: what the checks depend on, None when it cannot be derived
+    ## without API calls (not in bulk mode)
+    def getFingerprintParts(self):
+        return None
+    
+    def getFingerprint(self):
+        parts = self.getFingerprintParts()
+        if parts is None:
+            return None
+        
+        ## a different --rules selection must not reuse results of other checks
+        parts['checks'] = [chk['name'] for chk in self.getSelectedChecks(self.getRules())]
+        return ScanState.fingerprint(parts)
+    
+    def getPolicyFingerprint(self, detail, inlineKey):
+        managed = []
+        for policy in detail.get('AttachedManagedPolicies') or []:
+            managed.append(policy['PolicyArn'] + '@' + self.getManagedPolicyVersion(policy['PolicyArn']))
+        
+        inline = []
+        for policy in detail.get(inlineKey) or []:
+            inline.append(policy['PolicyName'] + '@' + Policy.hashDocument(Policy.parse(policy['PolicyDocument'])))
+        
+        return {
+            'managed': sorted(managed),
+            'inline': sorted(inline)
+        }
+    
     def getAgeInDay(self, dateTime):
         return self.getAge(dateTime, 60*60*24)
     
@@ -18,59 +56,71 @@ class IamCommon(Evaluator):
         if dateTime == 'N/A':
             return 999
         
-        ## <TODO>
-        # resultDate = date.create(dateTime)
+        if isinstance(dateTime, str):
+            dateTime = datetime.datetime.fromisoformat(dateTime.replace('Z', '+00:00'))
+        
+        if dateTime.tzinfo is None:
+            dateTime = dateTime.replace(tzinfo=datetime.timezone.utc)
+        
+        datediff = datetime.datetime.now(datetime.timezone.utc) - dateTime
+        return math.floor(datediff.total_seconds() / div)
         
-        # now = time()
-        # datediff = now - resultDate.getTimestamp()
-        # return floor(datediff / div)
+    def getManagedPolicyVersion(self, arn):
+        snap = self.snapshot['policies'].get(arn) if self.snapshot else None
+        if snap:
+            return snap['DefaultVersionId']
+        
+        versionId = PolicyCache.getVersion(arn)
+        if versionId is None:
+            versInfo = self.iamClient.get_policy(PolicyArn=arn)
+            versionId = versInfo.get('Policy')['DefaultVersionId']
+            PolicyCache.setVersion(arn, versionId)
+        
+        return versionId
+    
+    def getManagedPolicyVerdict(self, arn):
+        versionId = self.getManagedPolicyVersion(arn)
         
+        entry = PolicyCache.get(arn, versionId)
+        if entry is None:
+            snap = self.snapshot['policies'].get(arn) if self.snapshot else None
+            if snap and snap['Document'] is not None:
+                doc = snap['Document']
+            else:
+                detail = self.iamClient.get_policy_version(
+                    PolicyArn=arn,
+                    VersionId=versionId
+                )
+                doc = detail.get('PolicyVersion')['Document']
+            
+            pObj = Policy(doc)
+            entry = PolicyCache.set(arn, versionId, pObj.doc, pObj.inspectAccess())
+        
+        return entry['verdict']
+    
     def evaluateManagePolicy(self, policies):
-        cachePrefix = 'iam::mpolicy::'
-
-        if policies:
-            policyWithFullAccess = []
-            hasFullAccess = -1 # instead of false/true, easier handling on cache checking using !empty
-            for policy in policies:
-                if policy['PolicyName'] == 'AdministratorAccess':
-                    self.results['FullAdminAccess'] = [-1, 'AdministratorAccess']
-                    continue
-
-                cache = Config.get(cachePrefix + policy['PolicyArn'], "")
-                if cache == 1:
-                    hasFullAccess = 1
-                    policyWithFullAccess.append(policy['PolicyName'])
-                    continue
-                else:
-                    versInfo = self.iamClient.get_policy(PolicyArn=policy['PolicyArn'])
-                    vers = versInfo.get('Policy')
-                    verId = vers['DefaultVersionId']
-
-                    detail = self.iamClient.get_policy_version(
-                        PolicyArn=policy['PolicyArn'],
-                        VersionId=verId
-                    )
-
-                    doc = detail.get('PolicyVersion')
-                    doc = urllib.parse.unquote(doc['Document'])
-                    pObj = Policy(doc)
-
-                    if pObj.hasFullAccessToOneResource() == True:
-                        hasFullAccess = 1
-                        policyWithFullAccess.append(policy['PolicyName'])
-                    
-            Config.set(cachePrefix + policy['PolicyArn'], hasFullAccess)
+        policyWithFullAccess = []
+        for policy in policies or []:
+            if policy['PolicyName'] == 'AdministratorAccess':
+                self.results['FullAdminAccess'] = [-1, 'AdministratorAccess']
+                continue
+            
+            verdict = self.getManagedPolicyVerdict(policy['PolicyArn'])
+            if verdict['oneService'] == True:
+                policyWithFullAccess.append(policy['PolicyName'])
 
         if policyWithFullAccess:
             self.results['ManagedPolicyFullAccessOneServ'] = [-1, '<br>'.join(policyWithFullAccess)]
             
-    def evaluateInlinePolicy(self, inlinePolicies, identifier, entityType):
+    def evaluateInlinePolicy(self, inlinePolicies, identifier, entityType, documents=None):
         if inlinePolicies:
             self.results['InlinePolicy'] = [-1, '<br>'.join(inlinePolicies)]
             inlinePoliciesWithAdminAccess = []
             inlinePoliciesWithFullAccess = []
             for policy in inlinePolicies:
-                if entityType == 'user':
+                if documents is not None:
+                    resp = {'PolicyDocument': documents[policy]}
+                elif entityType == 'user':
                     resp = self.iamClient.get_user_policy(PolicyName=policy, UserName=identifier)
                 elif entityType == 'group':
                     resp = self.iamClient.get_group_policy(PolicyName=policy, GroupName=identifier)
@@ -78,8 +128,6 @@ class IamCommon(Evaluator):
                     resp = self.iamClient.get_role_policy(PolicyName=policy, RoleName=identifier)
                 
                 doc = resp.get('PolicyDocument')
-                doc = urllib.parse.unquote(doc)
-                
                 pObj = Policy(doc)
                 pObj.inspectAccess()
                 if pObj.hasFullAccessToOneResource() == True:
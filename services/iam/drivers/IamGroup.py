@@ -2,25 +2,50 @@ import boto3
 import datetime
 from dateutil.tz import tzlocal
 
+from services.Evaluator import check
 from .IamCommon import IamCommon
  
 class IamGroup(IamCommon):
-    def __init__(self, group, iamClient):
+    def __init__(self, group, iamClient, snapshot=None):
         super().__init__()
         self.group = group
         self.iamClient = iamClient
+        self.snapshot = snapshot
         self.__configPrefix = 'iam::group::'
         self.init()
         
+    def getFingerprintParts(self):
+        detail = self.getSnapshotEntity('groups', self.group['GroupName'])
+        if detail is None:
+            return None
+        
+        parts = self.getPolicyFingerprint(detail, 'GroupPolicyList')
+        parts['id'] = detail['GroupId']
+        parts['members'] = sorted(self.snapshot['groupMembers'].get(self.group['GroupName'], []))
+        return parts
+    
+    @check(keys=['groupEmptyUsers'], cost=1)
     def _checkGroupHasUsers(self):
         group = self.group['GroupName']
-        resp = self.iamClient.get_group(GroupName = group)
-        users = resp.get('Users')
+        if self.snapshot is not None:
+            users = self.snapshot['groupMembers'].get(group, [])
+        else:
+            resp = self.iamClient.get_group(GroupName = group)
+            users = resp.get('Users')
         if len(users) == 0:
             self.results['groupEmptyUsers'] = [-1, 'No users']
             
+    @check(keys=['ManagedPolicyFullAccessOneServ', 'FullAdminAccess', 'InlinePolicy', 'InlinePolicyFullAccessOneServ', 'InlinePolicyFullAdminAccess'], cost=4)
     def _checkGroupPolicyPermission(self):
         group = self.group['GroupName']
+        detail = self.getSnapshotEntity('groups', group)
+        if detail is not None:
+            self.evaluateManagePolicy(detail.get('AttachedManagedPolicies'))
+            
+            docs = {p['PolicyName']: p['PolicyDocument'] for p in detail.get('GroupPolicyList', [])}
+            self.evaluateInlinePolicy(list(docs.keys()), group, 'group', docs)
+            return
+        
         results = self.iamClient.list_attached_group_policies(GroupName = group)
         policies = results.get('AttachedPolicies')
         self.evaluateManagePolicy(policies)
@@ -2,26 +2,30 @@ import boto3
 import datetime
 from dateutil.tz import tzlocal
 
+from services.Evaluator import check
 from .IamCommon import IamCommon
 
 class IamRole(IamCommon):
     MAXSESSIONDURATION = 3600
     MAXROLENOTUSEDDAYS = 14
-    def __init__(self, role, iamClient):
+    def __init__(self, role, iamClient, snapshot=None):
         super().__init__()
         self.role = role
         self.iamClient = iamClient
+        self.snapshot = snapshot
         self._configPrefix = 'iam::role::'
 
         self.init()
         self.retrieveRoleDetail()
         
     def retrieveRoleDetail(self):
-        c = self.iamClient
-        result = c.get_role(RoleName=self.role['RoleName'])
+        detail = self.getSnapshotEntity('roles', self.role['RoleName'])
+        if detail is None:
+            c = self.iamClient
+            result = c.get_role(RoleName=self.role['RoleName'])
+            detail = result.get('Role')
         
-        detail = result.get('Role')
-        self.role['RoleLastUsed'] = detail['RoleLastUsed']
+        self.role['RoleLastUsed'] = detail.get('RoleLastUsed', {})
         
     #def _checkMocktest(self):
     #    self.results['Mocktest'] = [-1, 'GG']
@@ -29,6 +33,19 @@ class IamRole(IamCommon):
     #def _checkMocktest2(self):    
     #    self.results['Mocktest2'] = [-1, 'GG']
         
+    def getFingerprintParts(self):
+        detail = self.getSnapshotEntity('roles', self.role['RoleName'])
+        if detail is None:
+            return None
+        
+        ## RoleLastUsed is left out on purpose: unusedRole is time-based and always recomputed,
+        ## including it would invalidate every role that is in use
+        parts = self.getPolicyFingerprint(detail, 'RolePolicyList')
+        parts['id'] = detail['RoleId']
+        parts['maxSession'] = self.role.get('MaxSessionDuration')
+        return parts
+    
+    @check(keys=['unusedRole'], cost=0, timeBased=True)
     def _checkRoleOldAge(self):
         c = self.iamClient
         now = datetime.datetime.today().date()
@@ -50,12 +67,22 @@ class IamRole(IamCommon):
         if days > 30:
             self.results['unusedRole'] = [-1, "{} days".format(days)]
     
+    @check(keys=['roleLongSession'], cost=0)
     def _checkLongSessionDuration(self):
         if self.role['MaxSessionDuration'] > self.MAXSESSIONDURATION:
             self.results['roleLongSession'] = [-1, self.role['MaxSessionDuration']]
             
+    @check(keys=['ManagedPolicyFullAccessOneServ', 'FullAdminAccess', 'InlinePolicy', 'InlinePolicyFullAccessOneServ', 'InlinePolicyFullAdminAccess'], cost=4)
     def _checkRolePolicy(self):
         role = self.role['RoleName']
+        detail = self.getSnapshotEntity('roles', role)
+        if detail is not None:
+            self.evaluateManagePolicy(detail.get('AttachedManagedPolicies'))
+            
+            docs = {p['PolicyName']: p['PolicyDocument'] for p in detail.get('RolePolicyList', [])}
+            self.evaluateInlinePolicy(list(docs.keys()), role, 'role', docs)
+            return
+        
         ## Managed Policy
         resp = self.iamClient.list_attached_role_policies(RoleName=role)
         policies = resp.get('AttachedPolicies')
@@ -2,74 +2,59 @@ import boto3
 import datetime
 from dateutil.tz import tzlocal
 
+from services.Evaluator import check
 from .IamCommon import IamCommon
  
+## Credential report checks (MFA, console access, password & access key age)
+## are evaluated for all users at once in IamUserBatch
 class IamUser(IamCommon):
-    ENUM_NO_INFO = ['not_supported', 'no_information']
-    
-    def __init__(self, user, iamClient):
+    def __init__(self, user, iamClient, snapshot=None):
         super().__init__()
         self.user = user
         self.iamClient = iamClient
+        self.snapshot = snapshot
         # self.__configPrefix = 'iam::user::'
 
         self.init()
 
-    def _checkHasMFA(self):
-        xkey = "rootMfaActive" if self.user['user'] == "<root_account>" else "mfaActive"
-        if self.user['mfa_active'] == 'false':
-            self.results[xkey] = [-1, 'Inactive']
-
-    def _checkConsoleLastAccess(self):
-        key = ''
+    def getFingerprintParts(self):
+        detail = self.getSnapshotEntity('users', self.user['user'])
+        if detail is None:
+            return None
         
-        ##<TODO>
-        ##Created new Iam users, wait for this info to populate
-        if self.user['password_last_used'] in self.ENUM_NO_INFO:
-            return
-
-        daySinceLastAccess = self.getAgeInDay(self.user['password_last_used'])
-
-        if daySinceLastAccess > 365:
-            key = "consoleLastAccess365"
-        elif daySinceLastAccess > 90:
-            key = "consoleLastAccess90"
-        else:
-            key = False
-            
-        if key != False:
-            self.results[key] = [-1, daySinceLastAccess]
-            
-    def _checkPasswordLastChange(self):
-        if self.user['password_last_changed'] in self.ENUM_NO_INFO:
-            return
-        
-        daySinceLastChange = self.getAgeInDay(self.user['password_last_changed'])
-        
-        if daySinceLastChange > 365:
-            key = "passwordLastChange365"
-        elif daySinceLastChange > 90:
-            key = "passwordLastChange90"
-        else:
-            key = False
-            
-        if key != False:
-            self.results[key] = [-1, daySinceLastChange]
+        parts = self.getPolicyFingerprint(detail, 'UserPolicyList')
+        parts['id'] = detail['UserId']
+        parts['groups'] = sorted(detail.get('GroupList') or [])
+        return parts
     
+    @check(keys=['userNotUsingGroup'], cost=1)
     def _checkUserInGroup(self):
         user = self.user['user']
         if user == '<root_account>':
             return
         
-        resp = self.iamClient.list_groups_for_user(UserName = user)
-        groups = resp.get('Groups')
+        detail = self.getSnapshotEntity('users', user)
+        if detail is not None:
+            groups = detail.get('GroupList')
+        else:
+            resp = self.iamClient.list_groups_for_user(UserName = user)
+            groups = resp.get('Groups')
         if not groups:
             self.results['userNotUsingGroup'] = [-1, '-']
             
+    @check(keys=['ManagedPolicyFullAccessOneServ', 'FullAdminAccess', 'InlinePolicy', 'InlinePolicyFullAccessOneServ', 'InlinePolicyFullAdminAccess'], cost=4)
     def _checkUserPolicy(self):
         user = self.user['user']
         if user == '<root_account>':
             return
+        
+        detail = self.getSnapshotEntity('users', user)
+        if detail is not None:
+            self.evaluateManagePolicy(detail.get('AttachedManagedPolicies'))
+            
+            docs = {p['PolicyName']: p['PolicyDocument'] for p in detail.get('UserPolicyList', [])}
+            self.evaluateInlinePolicy(list(docs.keys()), user, 'user', docs)
+            return
             
         ## Managed Policy   
         resp = self.iamClient.list_attached_user_policies(UserName = user)
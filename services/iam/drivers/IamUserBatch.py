@@ -0,0 +1,118 @@
+import math
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from services.Evaluator import Evaluator, check
+
+## Credential-report checks are pure functions of the report columns, so they are
+## evaluated for a whole batch of users at once instead of per IamUser instance.
+## getInfo() returns one results dict per user, in the same order as the input.
+class IamUserBatch(Evaluator):
+    NEVER = 'N/A'
+    NEVER_AGE = 999
+
+    def __init__(self, users, now=None):
+        super().__init__()
+        self.users = users
+        self.now = now or datetime.datetime.now(datetime.timezone.utc)
+        self.results = [{} for _ in users]
+
+    ## epoch seconds per user: NaN when there is no information, -inf for 'N/A' (never)
+    def _column(self, field):
+        col = []
+        for user in self.users:
+            v = user[field]
+            if isinstance(v, datetime.datetime):
+                if v.tzinfo is None:
+                    v = v.replace(tzinfo=datetime.timezone.utc)
+                col.append(v.timestamp())
+            elif v == self.NEVER:
+                col.append(-math.inf)
+            else:
+                col.append(math.nan)
+        return col
+
+    ## age in days per user, None when the check does not apply
+    def ageInDays(self, field):
+        col = self._column(field)
+        now = self.now.timestamp()
+
+        if np is not None:
+            ts = np.array(col, dtype=float)
+            ages = np.floor((now - ts) / 86400)
+            ages[np.isinf(ages)] = self.NEVER_AGE
+            return [None if math.isnan(a) else int(a) for a in ages.tolist()]
+
+        ages = []
+        for ts in col:
+            if math.isnan(ts):
+                ages.append(None)
+            elif math.isinf(ts):
+                ages.append(self.NEVER_AGE)
+            else:
+                ages.append(int(math.floor((now - ts) / 86400)))
+        return ages
+
+    def _threshold(self, ages, key365, key90):
+        for ind, age in enumerate(ages):
+            if age is None:
+                continue
+
+            if age > 365:
+                self.results[ind][key365] = [-1, age]
+            elif age > 90:
+                self.results[ind][key90] = [-1, age]
+
+    @check(keys=['rootMfaActive', 'mfaActive'], cost=0)
+    def _checkHasMFA(self):
+        for ind, user in enumerate(self.users):
+            xkey = "rootMfaActive" if user['user'] == "<root_account>" else "mfaActive"
+            if user['mfa_active'] == False:
+                self.results[ind][xkey] = [-1, 'Inactive']
+
+    @check(keys=['consoleLastAccess365', 'consoleLastAccess90'], cost=0)
+    def _checkConsoleLastAccess(self):
+        self._threshold(self.ageInDays('password_last_used'), 'consoleLastAccess365', 'consoleLastAccess90')
+
+    @check(keys=['passwordLastChange365', 'passwordLastChange90'], cost=0)
+    def _checkPasswordLastChange(self):
+        self._threshold(self.ageInDays('password_last_changed'), 'passwordLastChange365', 'passwordLastChange90')
+
+    @check(keys=['accessKeyRotate365', 'accessKeyRotate90', 'accessKeyUnused90'], cost=0)
+    def _checkAccessKeys(self):
+        rotate = {}
+        unused = {}
+        for num in ['1', '2']:
+            prefix = 'access_key_' + num
+            rotatedAges = self.ageInDays(prefix + '_last_rotated')
+            usedAges = self.ageInDays(prefix + '_last_used_date')
+
+            for ind, user in enumerate(self.users):
+                if user[prefix + '_active'] != True:
+                    continue
+
+                age = rotatedAges[ind]
+                if age is not None and age > 90:
+                    rotate.setdefault(ind, []).append([age, "key{}: {} days".format(num, age)])
+
+                age = usedAges[ind]
+                if age == self.NEVER_AGE:
+                    ## a key that was never used only counts once it is older than 90 days
+                    if rotatedAges[ind] is not None and rotatedAges[ind] > 90:
+                        unused.setdefault(ind, []).append("key{}: never used".format(num))
+                elif age is not None and age > 90:
+                    unused.setdefault(ind, []).append("key{}: {} days".format(num, age))
+
+        for ind, keys in rotate.items():
+            key = 'accessKeyRotate365' if max(k[0] for k in keys) > 365 else 'accessKeyRotate90'
+            self.results[ind][key] = [-1, '<br>'.join(k[1] for k in keys)]
+
+        for ind, keys in unused.items():
+            self.results[ind]['accessKeyUnused90'] = [-1, '<br>'.join(keys)]
+
+    def getInfo(self):
+        return self.results
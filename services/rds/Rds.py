@@ -0,0 +1,176 @@
+import datetime
+import threading
+
+from utils.Config import Config
+from utils.Cache import Cache
+from utils.Tools import _pr
+from utils.WorkerPool import WorkerPool
+from utils.ClientFactory import ClientFactory
+from services.Service import Service
+from services.rds.drivers.RdsInstance import RdsInstance
+from services.rds.drivers.RdsCluster import RdsCluster
+
+class Rds(Service):
+    ## CloudWatch accepts at most 500 queries per get_metric_data call
+    METRIC_BATCH_SIZE = 500
+    METRIC_PERIOD = 300
+    METRIC_WINDOW_HOURS = 1
+
+    ## describe_db_* also return these, they are not RDS databases
+    EXCLUDED_ENGINES = ['neptune', 'docdb']
+
+    ## Engine versions are shared across regions on purpose: availability differs slightly
+    ## between regions, but the checks only need the latest major/minor of each engine.
+    ## One lock per engine, so regions fetching other engines are not held up.
+    _engineVersionLocks = {}
+    _lock = threading.Lock()
+
+    def __init__(self, region):
+        super().__init__(region)
+        self.rdsClient = ClientFactory.get('rds', region)
+        self.cwClient = ClientFactory.get('cloudwatch', region)
+
+    def _paginate(self, method, listKey, **kwargs):
+        paginator = self.rdsClient.get_paginator(method)
+        for page in paginator.paginate(**kwargs):
+            yield from page.get(listKey, [])
+
+    def _harvestInstances(self):
+        return {db['DBInstanceIdentifier']: db for db in self._paginate('describe_db_instances', 'DBInstances') if db['Engine'] not in self.EXCLUDED_ENGINES}
+
+    def _harvestClusters(self):
+        return {c['DBClusterIdentifier']: c for c in self._paginate('describe_db_clusters', 'DBClusters') if c['Engine'] not in self.EXCLUDED_ENGINES}
+
+    ## {name: value}, value is None when the parameter is not set in the group
+    def _harvestParameterGroup(self, args):
+        method, groupField, groupName = args
+        params = {}
+        for p in self._paginate(method, 'Parameters', **{groupField: groupName}):
+            if p['ParameterName'] in RdsInstance.PARAMETERS:
+                params[p['ParameterName']] = p.get('ParameterValue')
+        return groupName, params
+
+    def getEngineVersions(self, engine):
+        cache = Cache.namespace('rds_engine_versions')
+        versions = cache.get(engine)
+        if versions is not None:
+            return versions
+
+        ## held while fetching so concurrent regions don't each page through the same catalog
+        with Rds._lock:
+            lock = Rds._engineVersionLocks.setdefault(engine, threading.Lock())
+        with lock:
+            versions = cache.get(engine)
+            if versions is None:
+                versions = [v['EngineVersion'] for v in self._paginate('describe_db_engine_versions', 'DBEngineVersions', Engine=engine)]
+                cache.set(engine, versions)
+        return versions
+
+    ## lowest FreeStorageSpace (bytes) over the last hour, one get_metric_data per 500 instances
+    def _harvestFreeStorage(self, identifiers):
+        freeStorage = {}
+        ## aligned on the period so every datapoint covers a whole period
+        now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+        end = datetime.datetime.fromtimestamp(now - now % self.METRIC_PERIOD, datetime.timezone.utc)
+        start = end - datetime.timedelta(hours=self.METRIC_WINDOW_HOURS)
+
+        for i in range(0, len(identifiers), self.METRIC_BATCH_SIZE):
+            batch = identifiers[i:i + self.METRIC_BATCH_SIZE]
+            queries = [{
+                'Id': 'q' + str(ind),
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/RDS',
+                        'MetricName': 'FreeStorageSpace',
+                        'Dimensions': [{'Name': 'DBInstanceIdentifier', 'Value': identifier}]
+                    },
+                    'Period': self.METRIC_PERIOD,
+                    'Stat': 'Minimum'
+                }
+            } for ind, identifier in enumerate(batch)]
+
+            paginator = self.cwClient.get_paginator('get_metric_data')
+            for page in paginator.paginate(MetricDataQueries=queries, StartTime=start, EndTime=end):
+                for result in page.get('MetricDataResults', []):
+                    if not result.get('Values'):
+                        continue
+                    identifier = batch[int(result['Id'][1:])]
+                    lowest = min(result['Values'])
+                    freeStorage[identifier] = min(lowest, freeStorage.get(identifier, lowest))
+        return freeStorage
+
+    ## One paginated sweep for instances and clusters, then every distinct parameter group,
+    ## engine and the storage metrics of the region are fetched concurrently:
+    ##   parameters         DBParameterGroupName        -> {name: value}
+    ##   clusterParameters  DBClusterParameterGroupName -> {name: value}
+    ##   engineVersions     Engine                      -> [EngineVersion]
+    ##   freeStorage        DBInstanceIdentifier        -> bytes
+    def harvest(self):
+        pool = WorkerPool()
+        instances, clusters = pool.map(lambda f: f(), [self._harvestInstances, self._harvestClusters])
+
+        groups = set()
+        for db in instances.values():
+            for group in db.get('DBParameterGroups', []):
+                groups.add(('describe_db_parameters', 'DBParameterGroupName', group['DBParameterGroupName']))
+        clusterGroups = set(('describe_db_cluster_parameters', 'DBClusterParameterGroupName', c['DBClusterParameterGroup']) for c in clusters.values() if c.get('DBClusterParameterGroup'))
+        engines = sorted(set(r['Engine'] for r in list(instances.values()) + list(clusters.values())))
+
+        jobs = [('param', g) for g in sorted(groups)] + [('clusterParam', g) for g in sorted(clusterGroups)] + [('engine', e) for e in engines] + [('freeStorage', sorted(instances.keys()))]
+
+        def run(job):
+            kind, arg = job
+            if kind == 'engine':
+                return kind, (arg, self.getEngineVersions(arg))
+            if kind == 'freeStorage':
+                return kind, self._harvestFreeStorage(arg)
+            return kind, self._harvestParameterGroup(arg)
+
+        snapshot = {
+            'instances': instances,
+            'clusters': clusters,
+            'parameters': {},
+            'clusterParameters': {},
+            'engineVersions': {},
+            'freeStorage': {}
+        }
+        for kind, result in pool.map(run, jobs):
+            if kind == 'param':
+                snapshot['parameters'][result[0]] = result[1]
+            elif kind == 'clusterParam':
+                snapshot['clusterParameters'][result[0]] = result[1]
+            elif kind == 'engine':
+                snapshot['engineVersions'][result[0]] = result[1]
+            else:
+                snapshot['freeStorage'] = result
+        return snapshot
+
+    ## tags come with the describe output, no tagging call needed
+    def getResources(self, table):
+        return [item for item in self.snapshot[table].values() if self.resourceHasTags(item.get('TagList', []))]
+
+    def advise(self):
+        objs = {}
+
+        print('... (RDS) harvesting ' + self.region)
+        self.snapshot = self.harvest()
+
+        for db in self.getResources('instances'):
+            obj = RdsInstance(db, self.snapshot)
+            obj.run()
+            objs[db['Engine'] + '::' + db['DBInstanceIdentifier']] = obj.getInfo()
+
+        for cluster in self.getResources('clusters'):
+            if not cluster['Engine'].startswith('aurora'):
+                continue
+            obj = RdsCluster(cluster, self.snapshot)
+            obj.run()
+            objs[cluster['Engine'] + '::cluster/' + cluster['DBClusterIdentifier']] = obj.getInfo()
+
+        return objs
+
+if __name__ == "__main__":
+    Config.init()
+    o = Rds('ap-southeast-1')
+    out = o.advise()
+    _pr(out)
@@ -0,0 +1,47 @@
+from services.Evaluator import check
+from .RdsCommon import RdsCommon
+
+## Aurora cluster level settings (the member instances are evaluated by RdsInstance)
+class RdsCluster(RdsCommon):
+    MIN_CLUSTER_SIZE = 2
+    MAX_CLUSTER_SIZE = 7
+
+    def __init__(self, cluster, snapshot):
+        super().__init__()
+        self.cluster = cluster
+        self.snapshot = snapshot
+        self.engine = cluster['Engine']
+
+        self.init()
+
+    @check(keys=['MultiAZ'], cost=0)
+    def _checkMultiAz(self):
+        if not self.cluster.get('MultiAZ'):
+            self.results['MultiAZ'] = [-1, 'Off']
+
+    @check(keys=['Aurora__ClusterSize'], cost=0)
+    def _checkClusterSize(self):
+        size = len(self.cluster.get('DBClusterMembers', []))
+        if size < self.MIN_CLUSTER_SIZE or size > self.MAX_CLUSTER_SIZE:
+            self.results['Aurora__ClusterSize'] = [-1, "{} instance(s)".format(size)]
+
+    @check(keys=['EngineVersionMajor', 'EngineVersionMinor'], cost=0)
+    def _checkEngineVersion(self):
+        self.evaluateEngineVersion(self.engine, self.cluster['EngineVersion'])
+
+    ## Aurora backups cannot be disabled, retention is at least 1 day
+    @check(keys=['BackupTooLow'], cost=0)
+    def _checkBackup(self):
+        days = self.cluster.get('BackupRetentionPeriod', 0)
+        if days < self.MIN_BACKUP_RETENTION:
+            self.results['BackupTooLow'] = [-1, "{} day(s)".format(days)]
+
+    @check(keys=['StorageEncrypted'], cost=0)
+    def _checkStorageEncrypted(self):
+        if not self.cluster.get('StorageEncrypted'):
+            self.results['StorageEncrypted'] = [-1, 'Off']
+
+    @check(keys=['DeleteProtection'], cost=0)
+    def _checkDeleteProtection(self):
+        if not self.cluster.get('DeletionProtection'):
+            self.results['DeleteProtection'] = [-1, 'Off']
@@ -0,0 +1,48 @@
+import re
+
+from services.Evaluator import Evaluator
+
+## Shared by instance & cluster drivers. Everything is read from the region snapshot built
+## by Rds.harvest(), drivers make no API call.
+class RdsCommon(Evaluator):
+    MYSQL_ENGINES = ['mysql', 'mariadb', 'aurora', 'aurora-mysql']
+    PG_ENGINES = ['postgres', 'aurora-postgresql']
+    MIN_BACKUP_RETENTION = 7
+
+    snapshot = None
+
+    def isAurora(self, engine):
+        return engine.startswith('aurora')
+
+    ## '8.0.35' -> '8.0', '15.4' -> '15', '9.6.24' -> '9.6', '8.0.mysql_aurora.3.04.0' -> '8.0',
+    ## '19.0.0.0.ru-2023-10.rur-2023-10.r1' -> '19'
+    @staticmethod
+    def getMajorVersion(engine, version):
+        parts = version.split('.')
+        if engine in RdsCommon.MYSQL_ENGINES:
+            return '.'.join(parts[:2])
+        if engine in RdsCommon.PG_ENGINES and parts[0].isdigit() and int(parts[0]) < 10:
+            return '.'.join(parts[:2])
+        return parts[0]
+
+    ## sortable form of a version, numeric tokens compared as numbers
+    @staticmethod
+    def versionKey(version):
+        return tuple((0, int(t), '') if t.isdigit() else (1, 0, t) for t in re.split(r'[.\-_]', version))
+
+    def evaluateEngineVersion(self, engine, version):
+        versions = self.snapshot['engineVersions'].get(engine) or []
+        if not versions:
+            return
+
+        majorKey = lambda v: self.versionKey(self.getMajorVersion(engine, v))
+        currentMajor = self.getMajorVersion(engine, version)
+        latestMajor = self.getMajorVersion(engine, max(versions, key=majorKey))
+        if self.versionKey(currentMajor) < self.versionKey(latestMajor):
+            self.results['EngineVersionMajor'] = [-1, "{} (latest major {})".format(version, latestMajor)]
+
+        sameMajor = [v for v in versions if self.getMajorVersion(engine, v) == currentMajor]
+        if sameMajor:
+            latest = max(sameMajor, key=self.versionKey)
+            if self.versionKey(version) < self.versionKey(latest):
+                self.results['EngineVersionMinor'] = [-1, "{} (latest {})".format(version, latest)]
@@ -0,0 +1,179 @@
+from utils.Tools import _splitInstanceFamily
+from services.Evaluator import check
+from .RdsCommon import RdsCommon
+
+class RdsInstance(RdsCommon):
+    ## generations older than these are reported (latest families: r5, m5, t3, m6g, r6g)
+    MIN_GENERATION = {'m': 5, 'r': 5, 't': 3}
+    MAX_MONITORING_INTERVAL = 30
+    MIN_FREE_STORAGE_PCT = 20
+
+    ## only these are kept from the (several hundred) parameters of each group
+    PARAMETERS = [
+        'sync_binlog', 'innodb_flush_log_at_trx_commit', 'general_log', 'performance_schema',
+        'idle_in_transaction_session_timeout', 'statement_timeout', 'log_temp_files', 'temp_file_limit',
+        'rds.force_autovacuum_logging_level', 'log_autovacuum_min_duration', 'track_io_timing', 'log_statement'
+    ]
+
+    def __init__(self, db, snapshot):
+        super().__init__()
+        self.db = db
+        self.snapshot = snapshot
+        self.engine = db['Engine']
+        self.params = self.getParameters()
+
+        self.init()
+
+    ## Aurora: cluster parameter group, overridden by what is set on the instance group
+    def getParameters(self):
+        params = {}
+        cluster = self.snapshot['clusters'].get(self.db.get('DBClusterIdentifier'))
+        if cluster is not None:
+            params.update(self.snapshot['clusterParameters'].get(cluster.get('DBClusterParameterGroup'), {}))
+
+        for group in self.db.get('DBParameterGroups', []):
+            for name, value in self.snapshot['parameters'].get(group['DBParameterGroupName'], {}).items():
+                if value is not None or name not in params:
+                    params[name] = value
+        return params
+
+    @check(keys=['MultiAZ'], cost=0)
+    def _checkMultiAz(self):
+        if self.isAurora(self.engine):
+            return
+        if not self.db.get('MultiAZ'):
+            self.results['MultiAZ'] = [-1, 'Off']
+
+    @check(keys=['EngineVersionMajor', 'EngineVersionMinor'], cost=0)
+    def _checkEngineVersion(self):
+        if self.isAurora(self.engine):
+            return
+        self.evaluateEngineVersion(self.engine, self.db['EngineVersion'])
+
+    @check(keys=['Backup', 'BackupTooLow'], cost=0)
+    def _checkBackup(self):
+        if self.isAurora(self.engine):
+            return
+        days = self.db.get('BackupRetentionPeriod', 0)
+        if days == 0:
+            self.results['Backup'] = [-1, 'Disabled']
+        elif days < self.MIN_BACKUP_RETENTION:
+            self.results['BackupTooLow'] = [-1, "{} day(s)".format(days)]
+
+    @check(keys=['AutoMinorVersionUpgrade'], cost=0)
+    def _checkAutoMinorVersionUpgrade(self):
+        if not self.db.get('AutoMinorVersionUpgrade'):
+            self.results['AutoMinorVersionUpgrade'] = [-1, 'Off']
+
+    @check(keys=['StorageEncrypted'], cost=0)
+    def _checkStorageEncrypted(self):
+        if self.isAurora(self.engine):
+            return
+        if not self.db.get('StorageEncrypted'):
+            self.results['StorageEncrypted'] = [-1, 'Off']
+
+    @check(keys=['PerformanceInsightsEnabled'], cost=0)
+    def _checkPerformanceInsights(self):
+        if not self.db.get('PerformanceInsightsEnabled'):
+            self.results['PerformanceInsightsEnabled'] = [-1, 'Off']
+
+    @check(keys=['DefaultParams'], cost=0)
+    def _checkDefaultParams(self):
+        for group in self.db.get('DBParameterGroups', []):
+            if group['DBParameterGroupName'].startswith('default.'):
+                self.results['DefaultParams'] = [-1, group['DBParameterGroupName']]
+
+    @check(keys=['EnhancedMonitor'], cost=0)
+    def _checkEnhancedMonitoring(self):
+        interval = self.db.get('MonitoringInterval', 0)
+        if interval == 0 or interval > self.MAX_MONITORING_INTERVAL:
+            self.results['EnhancedMonitor'] = [-1, "Interval: {}s".format(interval) if interval else 'Off']
+
+    @check(keys=['DeleteProtection'], cost=0)
+    def _checkDeleteProtection(self):
+        if self.isAurora(self.engine):
+            return
+        if not self.db.get('DeletionProtection'):
+            self.results['DeleteProtection'] = [-1, 'Off']
+
+    @check(keys=['PubliclyAccessible'], cost=0)
+    def _checkPubliclyAccessible(self):
+        if self.db.get('PubliclyAccessible'):
+            self.results['PubliclyAccessible'] = [-1, 'On']
+
+    @check(keys=['Subnets3Az'], cost=0)
+    def _checkSubnetAz(self):
+        subnets = self.db.get('DBSubnetGroup', {}).get('Subnets', [])
+        if not subnets:
+            return
+        azs = set(s.get('SubnetAvailabilityZone', {}).get('Name') for s in subnets)
+        if len(azs) < 3:
+            self.results['Subnets3Az'] = [-1, "{} AZ(s)".format(len(azs))]
+
+    ## only the family & generation are read, the EC2 spec catalog is not needed
+    @check(keys=['LatestInstanceGeneration', 'BurstableInstance'], cost=0)
+    def _checkInstanceClass(self):
+        parsed = _splitInstanceFamily(self.db['DBInstanceClass'])
+        if parsed is None:
+            return
+
+        family, version, _ = parsed[2]
+        version = int(version)
+        if family in self.MIN_GENERATION and version < self.MIN_GENERATION[family]:
+            self.results['LatestInstanceGeneration'] = [-1, self.db['DBInstanceClass']]
+        if family == 't':
+            self.results['BurstableInstance'] = [-1, self.db['DBInstanceClass']]
+
+    @check(keys=['FreeStorage20pct'], cost=0)
+    def _checkFreeStorage(self):
+        free = self.snapshot['freeStorage'].get(self.db['DBInstanceIdentifier'])
+        allocated = self.db.get('AllocatedStorage', 0)
+        if free is None or not allocated or self.isAurora(self.engine):
+            return
+
+        pct = free / (allocated * 1024 ** 3) * 100
+        if pct < self.MIN_FREE_STORAGE_PCT:
+            self.results['FreeStorage20pct'] = [-1, "{:.1f}% free".format(pct)]
+
+    def getParam(self, name):
+        return self.params.get(name)
+
+    @check(keys=['MYSQL__param_syncBinLog', 'MYSQL__param_innodbFlushTrxCommit', 'MYSQL__LogsErrorEnable', 'MYSQL__LogsGeneral', 'MYSQL__PerfSchema'], cost=0)
+    def _checkMysqlParams(self):
+        if self.engine not in self.MYSQL_ENGINES:
+            return
+
+        if 'sync_binlog' in self.params and self.getParam('sync_binlog') != '1':
+            self.results['MYSQL__param_syncBinLog'] = [-1, self.getParam('sync_binlog')]
+        if 'innodb_flush_log_at_trx_commit' in self.params and self.getParam('innodb_flush_log_at_trx_commit') != '1':
+            self.results['MYSQL__param_innodbFlushTrxCommit'] = [-1, self.getParam('innodb_flush_log_at_trx_commit')]
+        ## Aurora exports logs at cluster level
+        source = self.snapshot['clusters'].get(self.db.get('DBClusterIdentifier'), {}) if self.isAurora(self.engine) else self.db
+        if 'error' not in source.get('EnabledCloudwatchLogsExports', []):
+            self.results['MYSQL__LogsErrorEnable'] = [-1, 'Off']
+        if self.getParam('general_log') == '1':
+            self.results['MYSQL__LogsGeneral'] = [-1, 'On']
+        if 'performance_schema' in self.params and self.getParam('performance_schema') != '1':
+            self.results['MYSQL__PerfSchema'] = [-1, 'Off']
+
+    @check(keys=['PG__param_idleTransTimeout', 'PG__param_statementTimeout', 'PG__param_logTempFiles', 'PG__param_tempFileLimit', 'PG__param_rdsAutoVacuum', 'PG__param_autoVacDuration', 'PG__param_trackIoTime', 'PG__param_logStatement'], cost=0)
+    def _checkPostgresParams(self):
+        if self.engine not in self.PG_ENGINES:
+            return
+
+        if self.getParam('idle_in_transaction_session_timeout') in [None, '0']:
+            self.results['PG__param_idleTransTimeout'] = [-1, self.getParam('idle_in_transaction_session_timeout') or 'Not set']
+        if self.getParam('statement_timeout') in [None, '0']:
+            self.results['PG__param_statementTimeout'] = [-1, self.getParam('statement_timeout') or 'Not set']
+        if self.getParam('log_temp_files') in [None, '-1', '0']:
+            self.results['PG__param_logTempFiles'] = [-1, self.getParam('log_temp_files') or 'Not set']
+        if self.getParam('temp_file_limit') in [None, '-1']:
+            self.results['PG__param_tempFileLimit'] = [-1, self.getParam('temp_file_limit') or 'Not set']
+        if self.getParam('rds.force_autovacuum_logging_level') in [None, 'disabled']:
+            self.results['PG__param_rdsAutoVacuum'] = [-1, self.getParam('rds.force_autovacuum_logging_level') or 'Not set']
+        if self.getParam('log_autovacuum_min_duration') in [None, '-1']:
+            self.results['PG__param_autoVacDuration'] = [-1, self.getParam('log_autovacuum_min_duration') or 'Not set']
+        if self.getParam('track_io_timing') != '1':
+            self.results['PG__param_trackIoTime'] = [-1, 'Off']
+        if self.getParam('log_statement') in ['all', 'mod']:
+            self.results['PG__param_logStatement'] = [-1, self.getParam('log_statement')]
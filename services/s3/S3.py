@@ -3,66 +3,123 @@ import botocore
 
 import json
 import time
+import threading
 
 from utils.Config import Config
-from utils.Tools import _pr
+from utils.Tools import _pr, _warn
+from utils.WorkerPool import WorkerPool
+from utils.ClientFactory import ClientFactory
 from services.Service import Service
+from services.s3.drivers.S3Bucket import S3Bucket
+
 class S3(Service):
+    ## legacy LocationConstraint values returned by GetBucketLocation
+    LOCATION_ALIASES = {
+        None: 'us-east-1',
+        '': 'us-east-1',
+        'EU': 'eu-west-1'
+    }
+    
+    ## regions are scanned concurrently, the first one discovers every bucket
+    _bucketLock = threading.Lock()
+    
     def __init__(self, region):
         super().__init__(region)
         self.region = region
         
-        self.s3Client = boto3.client('s3')
-        self.s3Control = boto3.client('s3control')
+        self.s3Client = ClientFactory.get('s3', region)
+        self.s3Control = ClientFactory.get('s3control', region)
+    
+    def listBuckets(self):
+        arr = []
+        args = {}
+        while True:
+            results = self.s3Client.list_buckets(**args)
+            arr.extend(results.get('Buckets', []))
+            if not results.get('ContinuationToken'):
+                break
+            args['ContinuationToken'] = results.get('ContinuationToken')
+        return arr
+    
+    def getBucketRegion(self, bucket):
+        try:
+            loc = self.s3Client.get_bucket_location(Bucket = bucket['Name'])
+        except botocore.exceptions.ClientError as e:
+            ## throttling that outlasted botocore's retries included: one bucket is skipped,
+            ## discovery of the others still completes and is cached for every region
+            _warn(" Unable to locate bucket <{}>: {}".format(bucket['Name'], e.response.get('Error', {}).get('Code')))
+            return bucket, None
         
-        # buckets = Config.get('s3::buckets', [])
+        reg = loc.get('LocationConstraint')
+        return bucket, self.LOCATION_ALIASES.get(reg, reg)
     
-    def getResources():
-        buckets = Config.get('s3::buckets', [])
-        # $buckets = ['ap-southeast-1' => ['kuettai-personal']];
-        if not buckets:
-            buckets = []
-            results = self.s3Client.list_buckets()
-            
-            arr = results.get('Buckets')
-            while results.get('Maker') is not None:
-                results = self.s3Client.list_buckets(
-                    Maker = results.get('Maker')
-                )    
-                arr = arr + results.get('Buckets')
+    ## {region: [bucket, ...]}, built once per run: one list_buckets and the location
+    ## lookups spread over the worker pool
+    def getBucketsByRegion(self):
+        buckets = Config.get('s3::buckets', None)
+        if buckets is not None:
+            return buckets
+        
+        with S3._bucketLock:
+            buckets = Config.get('s3::buckets', None)
+            if buckets is not None:
+                return buckets
             
-            for ind, bucket in enumerate(arr):
-                loc = self.s3Client.get_bucket_location(
-                    Bucket = bucket['Name'] 
-                )
-                
-                reg = loc.get('LocationConstraint')
-                buckets[reg].append(arr[ind])
+            buckets = {}
+            pool = WorkerPool()
+            for bucket, reg in pool.map(self.getBucketRegion, self.listBuckets()):
+                if reg is not None:
+                    buckets.setdefault(reg, []).append(bucket)
             
             Config.set('s3::buckets', buckets)
-        
-        if self.region in buckets:
-            _buckets = buckets[self.region]
-        else:
-            return []
+        return buckets
+    
+    def getResources(self):
+        buckets = self.getBucketsByRegion()
+        _buckets = buckets.get(self.region, [])
             
         if not self.tags:
             return _buckets
         
-        filteredBuckets = []
-        for bucket in _buckets:
-            try:
-                result = self.s3Client.get_bucket_tagging(Bucket = bucket['Name'])
-                tags =result.get('TagSet')
-            
-                if self.resourceHasTags(tags):
-                    filteredBuckets.append(bucket)
-            except S3E as e:
-                ## Do nothing, no tags has been define;clear
-                pass
-            
-        return filteredBuckets    
+        prefix = 'arn:' + self.getPartition(self.region) + ':s3:::'
+        return [bucket for bucket in _buckets if self.arnHasTags(prefix + bucket['Name'])]
+    
+    def _fetchConfig(self, job):
+        bucket, name = job
+        return bucket, name, S3Bucket.fetch(self.s3Client, bucket['Name'], name)
+    
+    ## every get_bucket_* call of every bucket goes through the worker pool; results come
+    ## back in order, so a bucket is yielded as soon as its last configuration arrives
+    ## while the next buckets are still being fetched
+    def prefetch(self, buckets, names):
+        if not names:
+            for bucket in buckets:
+                yield bucket, {}
+            return
+        
+        pool = WorkerPool()
+        jobs = ((bucket, name) for bucket in buckets for name in names)
+        config = {}
+        for bucket, name, result in pool.map(self._fetchConfig, jobs):
+            config[name] = result
+            if len(config) == len(names):
+                yield bucket, config
+                config = {}
+    
+    def advise(self):
+        objs = {}
+        names = S3Bucket.getRequiredFetches(S3Bucket.getRules())
+        
+        for bucket, config in self.prefetch(self.getResources(), names):
+            print('... (S3::Bucket) inspecting ' + bucket['Name'])
+            obj = S3Bucket(bucket, self.s3Client, config)
+            obj.run()
+            objs['Bucket::' + bucket['Name']] = obj.getInfo()
+        
+        return objs
         
 if __name__ == "__main__":
+    Config.init()
     o = S3('ap-southeast-1')
-    o.advise()
\ No newline at end of file
+    out = o.advise()
+    _pr(out)
\ No newline at end of file
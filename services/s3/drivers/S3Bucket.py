@@ -2,15 +2,172 @@ import urllib.parse
 from datetime import date
 
 import boto3
+import botocore
 
 from utils.Config import Config
 from utils.Policy import Policy
-from services.Evaluator import Evaluator
+from services.Evaluator import Evaluator, check
 
+## Bucket configuration is fetched up front (S3.advise runs the calls of every bucket on
+## the worker pool), checks only read self.config.
+## A configuration that does not exist is data (None), not an exception.
 class S3Bucket(Evaluator):
-    def __init__(self, bucket, s3Client):
+    ## config name: (client method, error codes meaning "not configured")
+    FETCHES = {
+        'encryption': ('get_bucket_encryption', ['ServerSideEncryptionConfigurationNotFoundError']),
+        'publicAccessBlock': ('get_public_access_block', ['NoSuchPublicAccessBlockConfiguration']),
+        'versioning': ('get_bucket_versioning', []),
+        'objectLock': ('get_object_lock_configuration', ['ObjectLockConfigurationNotFoundError']),
+        'replication': ('get_bucket_replication', ['ReplicationConfigurationNotFoundError']),
+        'lifecycle': ('get_bucket_lifecycle_configuration', ['NoSuchLifecycleConfiguration']),
+        'logging': ('get_bucket_logging', []),
+        'intelligentTiering': ('list_bucket_intelligent_tiering_configurations', []),
+        'policy': ('get_bucket_policy', ['NoSuchBucketPolicy'])
+    }
+
+    ## check -> configuration it reads, so --rules only fetches what is needed
+    CHECK_FETCHES = {
+        '_checkEncryption': ['encryption'],
+        '_checkPublicAccessBlock': ['publicAccessBlock'],
+        '_checkMfaDelete': ['versioning'],
+        '_checkVersioning': ['versioning'],
+        '_checkObjectLock': ['objectLock'],
+        '_checkReplication': ['replication'],
+        '_checkLifecycle': ['lifecycle'],
+        '_checkLogging': ['logging'],
+        '_checkIntelligentTiering': ['intelligentTiering', 'lifecycle'],
+        '_checkTlsEnforced': ['policy']
+    }
+
+    PUBLIC_ACCESS_BLOCK_FLAGS = ['BlockPublicAcls', 'IgnorePublicAcls', 'BlockPublicPolicy', 'RestrictPublicBuckets']
+
+    def __init__(self, bucket, s3Client, config=None):
         super().__init__()
         self.bucket = bucket
         self.s3Client = s3Client
-        
-        self.init()
\ No newline at end of file
+
+        self.init()
+
+        ## standalone use, fetch sequentially
+        if config is None:
+            config = {name: self.fetch(s3Client, bucket['Name'], name) for name in self.getRequiredFetches(self.getRules())}
+        self.config = config
+
+    @classmethod
+    def getRequiredFetches(cls, rules):
+        names = []
+        for chk in cls.getSelectedChecks(rules):
+            for name in cls.CHECK_FETCHES.get(chk['name'], []):
+                if name not in names:
+                    names.append(name)
+        return names
+
+    ## response without ResponseMetadata, None when not configured, or the exception
+    ## for any other error, throttling that outlasted botocore's retries included (raised
+    ## again by getConfig, so only the checks using it fail).
+    @classmethod
+    def fetch(cls, s3Client, bucketName, name):
+        method, notConfigured = cls.FETCHES[name]
+        try:
+            resp = getattr(s3Client, method)(Bucket=bucketName)
+        except botocore.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in notConfigured:
+                return None
+            return e
+
+        resp.pop('ResponseMetadata', None)
+        return resp
+
+    ## KeyError when the check's CHECK_FETCHES entry is missing, rather than a false finding
+    def getConfig(self, name):
+        val = self.config[name]
+        if isinstance(val, Exception):
+            raise val
+        return val
+
+    @check(keys=['ServerSideEncrypted'], cost=0)
+    def _checkEncryption(self):
+        if self.getConfig('encryption') is None:
+            self.results['ServerSideEncrypted'] = [-1, 'Disabled']
+
+    @check(keys=['PublicAccessBlock'], cost=0)
+    def _checkPublicAccessBlock(self):
+        pab = self.getConfig('publicAccessBlock')
+        settings = (pab or {}).get('PublicAccessBlockConfiguration', {})
+
+        disabled = [flag for flag in self.PUBLIC_ACCESS_BLOCK_FLAGS if settings.get(flag) != True]
+        if disabled:
+            self.results['PublicAccessBlock'] = [-1, '<br>'.join(disabled)]
+
+    @check(keys=['MFADelete'], cost=0)
+    def _checkMfaDelete(self):
+        versioning = self.getConfig('versioning') or {}
+        if versioning.get('MFADelete') != 'Enabled':
+            self.results['MFADelete'] = [-1, 'Disabled']
+
+    @check(keys=['BucketVersioning'], cost=0)
+    def _checkVersioning(self):
+        versioning = self.getConfig('versioning') or {}
+        if versioning.get('Status') != 'Enabled':
+            self.results['BucketVersioning'] = [-1, versioning.get('Status', 'Disabled')]
+
+    @check(keys=['ObjectLock'], cost=0)
+    def _checkObjectLock(self):
+        lock = self.getConfig('objectLock') or {}
+        if lock.get('ObjectLockConfiguration', {}).get('ObjectLockEnabled') != 'Enabled':
+            self.results['ObjectLock'] = [-1, 'Disabled']
+
+    @check(keys=['BucketReplication'], cost=0)
+    def _checkReplication(self):
+        if self.getConfig('replication') is None:
+            self.results['BucketReplication'] = [-1, 'Disabled']
+
+    @check(keys=['BucketLifecycle'], cost=0)
+    def _checkLifecycle(self):
+        rules = (self.getConfig('lifecycle') or {}).get('Rules', [])
+        if not any(rule.get('Status') == 'Enabled' for rule in rules):
+            self.results['BucketLifecycle'] = [-1, 'No active rule']
+
+    @check(keys=['BucketLogging'], cost=0)
+    def _checkLogging(self):
+        if 'LoggingEnabled' not in (self.getConfig('logging') or {}):
+            self.results['BucketLogging'] = [-1, 'Disabled']
+
+    ## Intelligent-Tiering archive configuration, or a lifecycle rule moving objects to it
+    @check(keys=['ObjectsInIntelligentTier'], cost=0)
+    def _checkIntelligentTiering(self):
+        tiering = (self.getConfig('intelligentTiering') or {}).get('IntelligentTieringConfigurationList', [])
+        if any(cfg.get('Status') == 'Enabled' for cfg in tiering):
+            return
+
+        for rule in (self.getConfig('lifecycle') or {}).get('Rules', []):
+            if rule.get('Status') != 'Enabled':
+                continue
+            for transition in rule.get('Transitions', []):
+                if transition.get('StorageClass') == 'INTELLIGENT_TIERING':
+                    return
+
+        self.results['ObjectsInIntelligentTier'] = [-1, 'Not used']
+
+    ## bucket policy has to deny any request made with aws:SecureTransport = false
+    @check(keys=['TlsEnforced'], cost=0)
+    def _checkTlsEnforced(self):
+        policy = self.getConfig('policy')
+        if policy is not None:
+            doc = Policy.parse(policy['Policy'])
+            statements = doc.get('Statement', [])
+            if isinstance(statements, dict):
+                statements = [statements]
+
+            for stmt in statements:
+                if stmt.get('Effect') != 'Deny':
+                    continue
+                ## condition values are a scalar or a list of them
+                cond = stmt.get('Condition', {}).get('Bool', {})
+                values = cond.get('aws:SecureTransport', [])
+                if not isinstance(values, list):
+                    values = [values]
+                if 'false' in [str(v).lower() for v in values]:
+                    return
+
+        self.results['TlsEnforced'] = [-1, 'Not enforced']
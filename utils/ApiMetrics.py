@@ -0,0 +1,97 @@
+import time
+import threading
+
+from utils.Profiler import Profiler
+from utils.RateLimiter import RateLimiter
+
+## botocore event hooks registered on every client the services create.
+## Per (service, operation, region): calls, errors, retries, throttling responses and
+## end-to-end latency (retries included).
+class ApiMetrics:
+    _lock = threading.Lock()
+    _stats = {}
+
+    @staticmethod
+    def register(client):
+        region = client.meta.region_name or 'global'
+        events = client.meta.events
+
+        def beforeCall(context=None, **kwargs):
+            if context is not None:
+                context['_ssStart'] = time.perf_counter()
+
+        def afterCall(model=None, parsed=None, context=None, **kwargs):
+            start = (context or {}).get('_ssStart')
+            elapsed = time.perf_counter() - start if start else 0.0
+            parsed = parsed or {}
+            stat = ApiMetrics._statFor(model.service_model.service_name, model.name, region)
+            with ApiMetrics._lock:
+                stat['calls'] += 1
+                stat['latencies'].append(elapsed)
+                stat['retries'] += parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+                if 'Error' in parsed:
+                    stat['errors'] += 1
+
+        def needsRetry(response=None, operation=None, **kwargs):
+            if not response or operation is None:
+                return None
+            code = (response[1] or {}).get('Error', {}).get('Code')
+            if code in RateLimiter.THROTTLING_CODES:
+                stat = ApiMetrics._statFor(operation.service_model.service_name, operation.name, region)
+                with ApiMetrics._lock:
+                    stat['throttles'] += 1
+            return None
+
+        events.register('before-call', beforeCall)
+        events.register('after-call', afterCall)
+        events.register('needs-retry', needsRetry)
+        Profiler.attach(client)
+        return client
+
+    @staticmethod
+    def _statFor(service, operation, region):
+        key = (service, operation, region)
+        stat = ApiMetrics._stats.get(key)
+        if stat is None:
+            with ApiMetrics._lock:
+                stat = ApiMetrics._stats.setdefault(key, {
+                    'calls': 0,
+                    'errors': 0,
+                    'retries': 0,
+                    'throttles': 0,
+                    'latencies': []
+                })
+        return stat
+
+    @staticmethod
+    def _percentile(sortedValues, pct):
+        if not sortedValues:
+            return 0.0
+        ind = min(len(sortedValues) - 1, int(round(pct / 100 * (len(sortedValues) - 1))))
+        return sortedValues[ind]
+
+    @staticmethod
+    def getSummary():
+        rows = []
+        totals = {'calls': 0, 'errors': 0, 'retries': 0, 'throttles': 0}
+        with ApiMetrics._lock:
+            items = [(k, dict(v, latencies=sorted(v['latencies']))) for k, v in ApiMetrics._stats.items()]
+
+        for (service, operation, region), stat in sorted(items):
+            lat = stat['latencies']
+            rows.append({
+                'service': service,
+                'operation': operation,
+                'region': region,
+                'calls': stat['calls'],
+                'errors': stat['errors'],
+                'retries': stat['retries'],
+                'throttles': stat['throttles'],
+                'p50': round(ApiMetrics._percentile(lat, 50), 4),
+                'p90': round(ApiMetrics._percentile(lat, 90), 4),
+                'p99': round(ApiMetrics._percentile(lat, 99), 4)
+            })
+            for k in totals:
+                totals[k] += stat[k]
+
+        return {'totals': totals, 'operations': rows}
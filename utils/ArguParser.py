@@ -10,7 +10,9 @@ class ArguParser:
         "p": "profile",
         "b": "bucket",
         "m": "mode",
-        "f": "filters"
+        "f": "filters",
+        "c": "concurrency",
+        "w": "workers"
     }
     
     CLI_ARGUMENT_RULES = {
@@ -42,7 +44,13 @@ class ArguParser:
         # },
         "test": {
             "required": False,
-            "default": False
+            "default": False,
+            "help": "--test True|<path>, replay a cassette written by --record, no AWS calls are made"
+        },
+        "record": {
+            "required": False,
+            "default": False,
+            "help": "--record True|<path>, save every AWS API response of this scan to a cassette"
         },
         "mode": {
             "required": False,
@@ -59,26 +67,71 @@ class ArguParser:
         },
         "filters": {
             "required": False,
-            "default": False
+            "default": False,
+            "help": "--filters env=prod,staging%%team=data, resources need every tag, with any of the listed values"
+        },
+        "concurrency": {
+            "required": False,
+            "default": 4,
+            "help": "--concurrency 4"
+        },
+        "workers": {
+            "required": False,
+            "default": 8,
+            "help": "--workers 8, resources evaluated in parallel within a service"
+        },
+        "bulk": {
+            "required": False,
+            "default": False,
+            "help": "--bulk True|False, harvest IAM in one pass with get_account_authorization_details"
+        },
+        "full": {
+            "required": False,
+            "default": False,
+            "help": "--full True|False, ignore the previous scan state and evaluate every resource (bulk mode only)"
+        },
+        "policycache": {
+            "required": False,
+            "default": False,
+            "help": "--policycache True|<path>, keep AWS managed policy documents on disk between runs"
+        },
+        "rules": {
+            "required": False,
+            "default": False,
+            "help": "--rules hasmfa,rolepolicy | --rules -rolepolicy,-userpolicy | --rules maxcost=1"
+        },
+        "profiling": {
+            "required": False,
+            "default": False,
+            "help": "--profiling True|False, write per-check timings & cProfile stats to __fork/profile"
+        },
+        "ratelimit": {
+            "required": False,
+            "default": False,
+            "help": "--ratelimit iam=15,s3=100 (requests/sec, shared by all threads) | --ratelimit off"
         }
     }
 
     @staticmethod
-    def Load():
+    def getParser():
         parser = argparse.ArgumentParser(prog='Screener', description='Service-Screener, open-source to check your AWS environment against AWS Well-Architected Pillars')
     
+        ## short flags come from OPTLISTS, options without one are long-only
+        shortFlags = {v: k for k, v in ArguParser.OPTLISTS.items()}
         for k, v in ArguParser.CLI_ARGUMENT_RULES.items():
-            parser.add_argument('-' + k[:1], '--' + k, required=v['required'], default=v['default'], help=v.get('help', None))
+            flags = ['--' + k]
+            if k in shortFlags:
+                flags.insert(0, '-' + shortFlags[k])
+            parser.add_argument(*flags, required=v['required'], default=v['default'], help=v.get('help', None))
         
-        args = vars(parser.parse_args())
+        return parser
+
+    @staticmethod
+    def Load():
+        args = vars(ArguParser.getParser().parse_args())
         
         return args
         
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(prog='Screener', description='Service-Screener, open-source to check your AWS environment against AWS Well-Architected Pillars')
-    
-    for k, v in ArguParser.CLI_ARGUMENT_RULES.items():
-        parser.add_argument('-' + k[:1], '--' + k, required=v['required'], default=v['default'], help=v.get('help', None))
-    
-    args = parser.parse_args()
-    print(args.region)
\ No newline at end of file
+    args = ArguParser.getParser().parse_args()
+    print(args.region)
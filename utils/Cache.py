@@ -0,0 +1,128 @@
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+## One namespace of the cache: thread-safe, optional LRU bound (maxSize) and expiry (ttl, seconds).
+## copyOnRead hands out a shallow copy of dict/list values, so a caller tweaking its own
+## copy (e.g. _AWS_OPTIONS['region']) does not leak into other threads.
+class CacheNamespace:
+    def __init__(self, name, maxSize=None, ttl=None, copyOnRead=False):
+        self.name = name
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.copyOnRead = copyOnRead
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self._stats = {'hit': 0, 'miss': 0, 'eviction': 0, 'expired': 0}
+
+    def _read(self, val):
+        if self.copyOnRead and isinstance(val, (dict, list)):
+            return copy.copy(val)
+        return val
+
+    ## caller holds the lock
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+
+        val, expireAt = entry
+        if expireAt is not None and expireAt <= time.monotonic():
+            del self._data[key]
+            self._stats['expired'] += 1
+            return _MISSING
+
+        self._data.move_to_end(key)
+        return val
+
+    ## caller holds the lock
+    def _store(self, key, val):
+        expireAt = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (val, expireAt)
+        self._data.move_to_end(key)
+        while self.maxSize and len(self._data) > self.maxSize:
+            self._data.popitem(last=False)
+            self._stats['eviction'] += 1
+
+    def has(self, key):
+        with self._lock:
+            return self._lookup(key) is not _MISSING
+
+    def get(self, key, defaultValue=None):
+        with self._lock:
+            val = self._lookup(key)
+            if val is _MISSING:
+                self._stats['miss'] += 1
+                return defaultValue
+            self._stats['hit'] += 1
+        return self._read(val)
+
+    def set(self, key, val):
+        with self._lock:
+            self._store(key, val)
+
+    ## keeps the value already cached if any, returns the one that is cached
+    def setdefault(self, key, val):
+        with self._lock:
+            current = self._lookup(key)
+            if current is not _MISSING:
+                return self._read(current)
+            self._store(key, val)
+        return self._read(val)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data = OrderedDict()
+
+    def getStats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+        return stats
+
+class Cache:
+    DEFAULT_NAMESPACE = 'config'
+
+    ## namespaces not listed are unbounded, settings and run-wide values must never be evicted
+    POLICIES = {
+        'config': {'copyOnRead': True},
+        'policy_verdict': {'maxSize': 20000},
+        's3': {'maxSize': 64}
+    }
+
+    _lock = threading.Lock()
+    _namespaces = {}
+
+    @staticmethod
+    def namespace(name):
+        ns = Cache._namespaces.get(name)
+        if ns is None:
+            with Cache._lock:
+                ns = Cache._namespaces.get(name)
+                if ns is None:
+                    ns = Cache._namespaces[name] = CacheNamespace(name, **Cache.POLICIES.get(name, {}))
+        return ns
+
+    ## 's3::buckets' -> ('s3', 'buckets'), '_AWS_OPTIONS' -> ('config', '_AWS_OPTIONS')
+    @staticmethod
+    def splitKey(key):
+        if isinstance(key, str) and '::' in key:
+            name, rest = key.split('::', 1)
+            return name.lower(), rest
+        return Cache.DEFAULT_NAMESPACE, key
+
+    @staticmethod
+    def reset():
+        with Cache._lock:
+            Cache._namespaces = {}
+
+    @staticmethod
+    def getStats():
+        return {name: ns.getStats() for name, ns in sorted(Cache._namespaces.items())}
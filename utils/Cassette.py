@@ -0,0 +1,126 @@
+import os
+import gzip
+import json
+import base64
+import datetime
+import threading
+
+from botocore.awsrequest import AWSResponse
+
+class CassetteMiss(Exception):
+    pass
+
+## Record every AWS API response of a scan into a gzip'd JSON cassette, and replay it
+## later with zero network (--test). Replay short-circuits botocore's before-call event,
+## the same hook botocore's Stubber uses, but responses are matched on
+## (service, region, operation, params) instead of strict call order, since the scan
+## issues calls from many threads. Repeated identical calls are served in recorded order.
+class Cassette:
+    VERSION = 1
+
+    mode = None
+    _lock = threading.Lock()
+    _entries = {}
+
+    @staticmethod
+    def _encode(o):
+        if isinstance(o, datetime.datetime):
+            return {'__dt__': o.isoformat()}
+        if isinstance(o, (bytes, bytearray)):
+            return {'__b64__': base64.b64encode(o).decode('ascii')}
+        return str(o)
+
+    @staticmethod
+    def _decode(o):
+        if '__dt__' in o:
+            return datetime.datetime.fromisoformat(o['__dt__'])
+        if '__b64__' in o:
+            return base64.b64decode(o['__b64__'])
+        return o
+
+    ## time params (e.g. a metric window ending now) differ on every run, they are left
+    ## out of the key so a replay still finds the recorded response
+    @staticmethod
+    def _encodeKey(o):
+        if isinstance(o, datetime.datetime):
+            return '__time__'
+        return Cassette._encode(o)
+
+    @staticmethod
+    def makeKey(service, region, operation, params):
+        return json.dumps([service, region, operation, params], sort_keys=True, default=Cassette._encodeKey)
+
+    @staticmethod
+    def startRecording():
+        Cassette.mode = 'record'
+        Cassette._entries = {}
+
+    @staticmethod
+    def load(path):
+        with gzip.open(path, 'rt') as f:
+            data = json.load(f, object_hook=Cassette._decode)
+
+        if data.get('version') != Cassette.VERSION:
+            raise ValueError('Unsupported cassette version: {}'.format(data.get('version')))
+
+        Cassette._entries = {}
+        for row in data['entries']:
+            Cassette._entries.setdefault(row['key'], []).append(row)
+        Cassette.mode = 'replay'
+        return len(data['entries'])
+
+    @staticmethod
+    def save(path):
+        rows = []
+        with Cassette._lock:
+            for key, items in Cassette._entries.items():
+                rows.extend(items)
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with gzip.open(path, 'wt') as f:
+            json.dump({'version': Cassette.VERSION, 'entries': rows}, f, default=Cassette._encode)
+        return len(rows)
+
+    @staticmethod
+    def register(client):
+        if Cassette.mode is None:
+            return client
+
+        region = client.meta.region_name or 'global'
+        events = client.meta.events
+
+        def beforeParameterBuild(params=None, model=None, context=None, **kwargs):
+            context['_ssCassetteKey'] = Cassette.makeKey(model.service_model.service_name, region, model.name, params)
+
+        def afterCall(http_response=None, parsed=None, context=None, **kwargs):
+            key = context.get('_ssCassetteKey')
+            if key is None:
+                return
+            row = {
+                'key': key,
+                'status': getattr(http_response, 'status_code', 200),
+                'response': parsed
+            }
+            with Cassette._lock:
+                Cassette._entries.setdefault(key, []).append(row)
+
+        def beforeCall(model=None, context=None, **kwargs):
+            key = context.get('_ssCassetteKey')
+            with Cassette._lock:
+                rows = Cassette._entries.get(key)
+                if not rows:
+                    raise CassetteMiss('No recorded response for {}:{} ({})'.format(model.service_model.service_name, model.name, region))
+                ## keep the last response around for calls repeated more often than recorded
+                row = rows.pop(0) if len(rows) > 1 else rows[0]
+
+            return AWSResponse(None, row['status'], {}, None), row['response']
+
+        events.register('before-parameter-build', beforeParameterBuild)
+        if Cassette.mode == 'record':
+            events.register('after-call', afterCall)
+        else:
+            events.register('before-call', beforeCall)
+        return client
@@ -0,0 +1,84 @@
+import threading
+
+import boto3
+from botocore.config import Config as BotoConfig
+
+from utils.Config import Config
+from utils.ApiMetrics import ApiMetrics
+from utils.RateLimiter import RateLimiter
+from utils.Cassette import Cassette
+
+## One boto3 session per credential profile and one client per (service, region, profile),
+## shared by every thread (boto3 clients are thread-safe, sessions are not).
+## Connection pool is sized to the configured parallelism. RateLimiter paces the calls, so
+## botocore only retries in standard mode; adaptive mode (its own client-side limiter) is
+## used when --ratelimit is off.
+class ClientFactory:
+    MIN_POOL_CONNECTIONS = 10
+    MAX_ATTEMPTS = 5
+
+    ## S3 needs its own signer (s3v4), the generic 'v4' breaks payload signing
+    SIGV4_EXCLUDED = ['s3', 's3control']
+
+    _lock = threading.RLock()
+    _sessions = {}
+    _clients = {}
+
+    @staticmethod
+    def reset():
+        with ClientFactory._lock:
+            ClientFactory._sessions = {}
+            ClientFactory._clients = {}
+
+    @staticmethod
+    def getSession(profile=None):
+        key = profile or ''
+        with ClientFactory._lock:
+            if key not in ClientFactory._sessions:
+                ClientFactory._sessions[key] = boto3.session.Session(profile_name=profile)
+            return ClientFactory._sessions[key]
+
+    @staticmethod
+    def getPoolSize():
+        parallel = max(int(Config.get('concurrency', 1)), int(Config.get('workers', 1)))
+        return max(ClientFactory.MIN_POOL_CONNECTIONS, parallel)
+
+    @staticmethod
+    def buildConfig(service):
+        options = Config.get('_AWS_OPTIONS', {})
+        kwargs = {
+            'max_pool_connections': ClientFactory.getPoolSize(),
+            'retries': {
+                'mode': 'standard' if RateLimiter.enabled else 'adaptive',
+                'max_attempts': ClientFactory.MAX_ATTEMPTS
+            }
+        }
+
+        if options.get('signature_version') and service not in ClientFactory.SIGV4_EXCLUDED:
+            kwargs['signature_version'] = options['signature_version']
+
+        return BotoConfig(**kwargs)
+
+    @staticmethod
+    def get(service, region=None, profile=None):
+        if profile is None:
+            profile = Config.get('profile', None) or None
+
+        key = (service, region, profile)
+        client = ClientFactory._clients.get(key)
+        if client is not None:
+            return client
+
+        with ClientFactory._lock:
+            client = ClientFactory._clients.get(key)
+            if client is None:
+                session = ClientFactory.getSession(profile)
+                client = session.client(service, region_name=region, config=ClientFactory.buildConfig(service))
+                ## cassette first, on replay it answers before-call and nothing else runs;
+                ## limiter next, so its wait is not counted as API latency
+                Cassette.register(client)
+                RateLimiter.register(client)
+                ApiMetrics.register(client)
+                ClientFactory._clients[key] = client
+
+        return client
@@ -1,6 +1,10 @@
 import traceback
 import os
 
+from utils.Cache import Cache
+
+_MISSING = object()
+
 class Config:
     DIR_ROOT = os.getcwd()
     DIR_SERVICE = DIR_ROOT + '/services'
@@ -50,10 +54,10 @@ class Config:
     
     CURRENT_REGION = 'us-east-1'
     
+    ## values live in utils.Cache, namespaced by the key prefix before '::'
     @staticmethod
     def init():
-        global cache
-        cache = {}
+        Cache.reset()
     
     @staticmethod
     def setAccountInfo(__AWS_CONFIG):
@@ -84,14 +88,17 @@ class Config:
        
     @staticmethod 
     def set(key, val):
-        cache[key] = val
+        name, k = Cache.splitKey(key)
+        Cache.namespace(name).set(k, val)
 
     @staticmethod
     def get(key, defaultValue = False):
         ## <TODO>, fix the DEBUG variable
         DEBUG = False
-        if key in cache:
-            return cache[key]
+        name, k = Cache.splitKey(key)
+        val = Cache.namespace(name).get(k, _MISSING)
+        if val is not _MISSING:
+            return val
         
         if defaultValue == False:
             if DEBUG:
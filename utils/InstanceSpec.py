@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import threading
+
+import botocore
+
+from utils.Config import Config
+from utils.ClientFactory import ClientFactory
+
+## Instance type -> {'vcpu', 'memoryInGiB'}, persisted between runs.
+## Unknown types are fetched with describe_instance_types in batches of up to 100;
+## a batch rejected because of an invalid type is split until the culprit is isolated.
+## Every type keeps its own fetch time and expires TTL after it, independently of the others.
+class InstanceSpec:
+    FILE_VERSION = 2
+    TTL = 7 * 24 * 3600
+    BATCH_SIZE = 100
+    UNKNOWN = {'vcpu': 0, 'memoryInGiB': 0}
+
+    _lock = threading.RLock()
+    _specs = {}
+    _fetched = {}
+    _dirty = False
+
+    @staticmethod
+    def reset():
+        with InstanceSpec._lock:
+            InstanceSpec._specs = {}
+            InstanceSpec._fetched = {}
+            InstanceSpec._dirty = False
+
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return 0
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError:
+            return 0
+
+        if data.get('version') != InstanceSpec.FILE_VERSION:
+            return 0
+
+        cutoff = time.time() - InstanceSpec.TTL
+        cnt = 0
+        with InstanceSpec._lock:
+            for instanceType, row in data.get('specs', {}).items():
+                if row['fetched'] < cutoff:
+                    continue
+                InstanceSpec._specs[instanceType] = row['spec']
+                InstanceSpec._fetched[instanceType] = row['fetched']
+                cnt += 1
+        return cnt
+
+    @staticmethod
+    def _store(specs):
+        now = int(time.time())
+        with InstanceSpec._lock:
+            InstanceSpec._specs.update(specs)
+            for instanceType in specs:
+                InstanceSpec._fetched[instanceType] = now
+            InstanceSpec._dirty = True
+
+    @staticmethod
+    def save(path):
+        with InstanceSpec._lock:
+            if not InstanceSpec._dirty:
+                return 0
+            specs = {t: {'spec': spec, 'fetched': InstanceSpec._fetched[t]} for t, spec in InstanceSpec._specs.items()}
+            InstanceSpec._dirty = False
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with open(path, 'w') as f:
+            json.dump({'version': InstanceSpec.FILE_VERSION, 'specs': specs}, f)
+        return len(specs)
+
+    @staticmethod
+    def parseInfo(info):
+        return {
+            'vcpu': info['VCpuInfo']['DefaultVCpus'],
+            'memoryInGiB': round(info['MemoryInfo']['SizeInMiB']/1024, 2)
+        }
+
+    @staticmethod
+    def _describe(client, types):
+        found = {}
+        paginator = client.get_paginator('describe_instance_types')
+        try:
+            for page in paginator.paginate(InstanceTypes=types):
+                for info in page.get('InstanceTypes', []):
+                    found[info['InstanceType']] = InstanceSpec.parseInfo(info)
+        except botocore.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'InvalidInstanceType':
+                raise
+            if len(types) == 1:
+                return {types[0]: InstanceSpec.UNKNOWN}
+
+            half = len(types) // 2
+            found = InstanceSpec._describe(client, types[:half])
+            found.update(InstanceSpec._describe(client, types[half:]))
+            return found
+
+        for t in types:
+            found.setdefault(t, InstanceSpec.UNKNOWN)
+        return found
+
+    ## fetch every type not in the catalog yet, call before sizing many resources
+    @staticmethod
+    def prefetch(types, region=None):
+        with InstanceSpec._lock:
+            missing = sorted(set(t for t in types if t not in InstanceSpec._specs))
+            if not missing:
+                return 0
+
+            client = ClientFactory.get('ec2', region or Config.CURRENT_REGION)
+            for i in range(0, len(missing), InstanceSpec.BATCH_SIZE):
+                InstanceSpec._store(InstanceSpec._describe(client, missing[i:i + InstanceSpec.BATCH_SIZE]))
+        return len(missing)
+
+    ## every instance type offered in the region, ~10 paginated calls
+    @staticmethod
+    def sweep(region=None):
+        client = ClientFactory.get('ec2', region or Config.CURRENT_REGION)
+        specs = {}
+        paginator = client.get_paginator('describe_instance_types')
+        for page in paginator.paginate():
+            for info in page.get('InstanceTypes', []):
+                specs[info['InstanceType']] = InstanceSpec.parseInfo(info)
+
+        InstanceSpec._store(specs)
+        return len(specs)
+
+    @staticmethod
+    def get(instanceType):
+        spec = InstanceSpec._specs.get(instanceType)
+        if spec is None:
+            InstanceSpec.prefetch([instanceType])
+            spec = InstanceSpec._specs[instanceType]
+        return spec
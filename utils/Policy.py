@@ -1,42 +1,209 @@
+import re
 import json
+import hashlib
+import threading
+import urllib.parse
+from functools import lru_cache
 
+from utils.Cache import Cache
+
+## Actions commonly abused to escalate privileges
+## (create credentials, change policies, pass roles to compute)
+PRIVILEGE_ESCALATION_ACTIONS = [
+    'iam:AddUserToGroup',
+    'iam:AttachGroupPolicy',
+    'iam:AttachRolePolicy',
+    'iam:AttachUserPolicy',
+    'iam:CreateAccessKey',
+    'iam:CreateLoginProfile',
+    'iam:CreatePolicyVersion',
+    'iam:PassRole',
+    'iam:PutGroupPolicy',
+    'iam:PutRolePolicy',
+    'iam:PutUserPolicy',
+    'iam:SetDefaultPolicyVersion',
+    'iam:UpdateAssumeRolePolicy',
+    'iam:UpdateLoginProfile',
+    'sts:AssumeRole',
+    'lambda:CreateFunction',
+    'lambda:UpdateFunctionCode',
+    'lambda:AddPermission',
+    'ec2:RunInstances',
+    'glue:CreateDevEndpoint',
+    'glue:UpdateDevEndpoint',
+    'cloudformation:CreateStack',
+    'datapipeline:CreatePipeline',
+    'ssm:SendCommand',
+    'ssm:StartSession'
+]
+
+@lru_cache(maxsize=4096)
+def _compileAction(action):
+    pattern = re.escape(action).replace('\\*', '.*').replace('\\?', '.')
+    return re.compile('^' + pattern + '$', re.IGNORECASE)
+
+## '*' or an ARN wildcarding every resource of its service ('arn:aws:s3:::*')
+_RESOURCE_ALL = re.compile(r'^(\*|arn:[^:]+:[^:]+:[^:]*:[^:]*:\*)$')
+
+def _asList(val):
+    if val is None:
+        return []
+    return val if isinstance(val, list) else [val]
+
+class CompiledStatement:
+    __slots__ = ('allow', 'notAction', 'actions', 'matchers', 'resourceAll', 'hasCondition')
+
+    def __init__(self, statement):
+        self.allow = statement.get('Effect') == 'Allow'
+        self.notAction = 'NotAction' in statement
+        self.actions = _asList(statement.get('NotAction') if self.notAction else statement.get('Action'))
+        self.matchers = [_compileAction(a) for a in self.actions]
+        ## Allow + NotResource grants every resource but the listed ones
+        self.resourceAll = 'NotResource' in statement or any(_RESOURCE_ALL.match(r) for r in _asList(statement.get('Resource')))
+        self.hasCondition = bool(statement.get('Condition'))
+
+    def _listed(self, action):
+        for m in self.matchers:
+            if m.match(action):
+                return True
+        return False
+
+    def matches(self, action):
+        return self._listed(action) != self.notAction
+
+## Verdicts are computed once per distinct document and shared, instances are independent
+## of each other so it is safe to analyse policies from multiple threads.
 class Policy:
-    fullAccessList = {
-        'oneService': False,
-        'fullAdmin': False
-    }
-    
+    _lock = threading.Lock()
+    _stats = {'referenced': 0, 'analyzed': 0}
+
     def __init__(self, document):
-        self.doc = json.loads(document)
-    
-    def inspectAccess(self):
-        doc = self.doc
-        for statement in doc['Statement']:
-            if statement['Effect'] != 'Allow':
+        self.doc = self.parse(document)
+        self.docHash = self.hashDocument(self.doc)
+        self.verdict = None
+
+    @staticmethod
+    def parse(document):
+        if isinstance(document, dict):
+            return document
+
+        ## IAM returns url-encoded JSON, boto3 usually decodes it already
+        if not document.lstrip().startswith('{'):
+            document = urllib.parse.unquote(document)
+        return json.loads(document)
+
+    ## Same permissions => same canonical form: Sid dropped, single values turned into lists,
+    ## actions lower-cased (case-insensitive in IAM) and statements/values sorted
+    @staticmethod
+    def canonicalize(doc):
+        statements = []
+        for stmt in _asList(doc.get('Statement')):
+            c = {}
+            for k, v in stmt.items():
+                if k == 'Sid':
+                    continue
+                if k in ['Action', 'NotAction']:
+                    v = sorted(set(a.lower() for a in _asList(v)))
+                elif k in ['Resource', 'NotResource']:
+                    v = sorted(set(_asList(v)))
+                c[k] = v
+            statements.append(json.dumps(c, sort_keys=True, separators=(',', ':')))
+
+        return '[' + ','.join(sorted(set(statements))) + ']'
+
+    @staticmethod
+    def hashDocument(doc):
+        return hashlib.sha256(Policy.canonicalize(doc).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def getStats():
+        stats = dict(Policy._stats)
+        ref = stats['referenced']
+        stats['dedupeRatio'] = round(1 - stats['analyzed'] / ref, 4) if ref else 0
+        return stats
+
+    @staticmethod
+    def compile(doc):
+        return [CompiledStatement(stmt) for stmt in _asList(doc.get('Statement'))]
+
+    @staticmethod
+    def analyze(doc):
+        verdict = {
+            'fullAdmin': False,
+            'oneService': False,
+            'fullServices': [],
+            'privilegeEscalation': [],
+            'conditional': False
+        }
+
+        fullServices = set()
+        privEsc = set()
+        for stmt in Policy.compile(doc):
+            if not stmt.allow:
                 continue
-                
-            actions = statement['Action']
-            actions = actions if isinstance(actions, list) else [actions]
-            
-            for action in actions:
-                perm = action.split(':')
-                
-                if len(perm) != 1:
-                    serv, perm = perm
-                else:
-                    serv = perm = '*'
-                    
-                if perm == '*':
-                    self.fullAccessList['oneService'] = True
-                    
-                if perm == '*' and serv == '*':
-                    self.fullAccessList['fullAdmin'] = True
-                    return
-                    
-        return False
-    
+
+            if stmt.hasCondition:
+                verdict['conditional'] = True
+
+            ## full access is only reported when it is not scoped down to some resources
+            if stmt.resourceAll and stmt.notAction:
+                ## Allow + NotAction grants everything except what is listed
+                if not stmt._listed('*:*'):
+                    verdict['oneService'] = True
+            elif stmt.resourceAll:
+                for action in stmt.actions:
+                    perm = action.split(':')
+                    if len(perm) != 2:
+                        serv = perm = '*'
+                    else:
+                        serv, perm = perm
+
+                    if perm == '*':
+                        verdict['oneService'] = True
+                        fullServices.add(serv.lower())
+
+                    if perm == '*' and serv == '*':
+                        verdict['fullAdmin'] = True
+
+            for action in PRIVILEGE_ESCALATION_ACTIONS:
+                if action not in privEsc and stmt.matches(action):
+                    privEsc.add(action)
+
+        verdict['fullServices'] = sorted(fullServices)
+        verdict['privilegeEscalation'] = sorted(privEsc)
+        return verdict
+
+    ## returned verdict is shared between policies with the same document, do not modify
+    def inspectAccess(self):
+        if self.verdict is not None:
+            return self.verdict
+
+        verdicts = Cache.namespace('policy_verdict')
+        verdict = verdicts.get(self.docHash)
+        if verdict is None:
+            analyzed = self.analyze(self.doc)
+            verdict = verdicts.setdefault(self.docHash, analyzed)
+            if verdict is analyzed:
+                with Policy._lock:
+                    Policy._stats['analyzed'] += 1
+
+        with Policy._lock:
+            Policy._stats['referenced'] += 1
+
+        self.verdict = verdict
+        return verdict
+
     def hasFullAccessToOneResource(self):
-        return self.fullAccessList['oneService']
-    
+        return self.inspectAccess()['oneService']
+
     def hasFullAccessAdmin(self):
-        return self.fullAccessList['fullAdmin']
\ No newline at end of file
+        return self.inspectAccess()['fullAdmin']
+
+    def getFullAccessServices(self):
+        return self.inspectAccess()['fullServices']
+
+    def getPrivilegeEscalationActions(self):
+        return self.inspectAccess()['privilegeEscalation']
+
+    def isConditional(self):
+        return self.inspectAccess()['conditional']
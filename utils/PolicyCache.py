@@ -0,0 +1,102 @@
+import os
+import json
+import threading
+
+## Managed policy documents keyed by (PolicyArn, VersionId), shared by every driver in a run.
+## A policy version is immutable, so the parsed document and its verdict can be reused as-is.
+## Only AWS managed policies are written to disk: customer policies can be deleted and
+## recreated with the same arn & version id but different content.
+class PolicyCache:
+    FILE_VERSION = 2
+    AWS_MANAGED_PREFIX = 'arn:aws:iam::aws:policy/'
+
+    _lock = threading.Lock()
+    _entries = {}
+    _versions = {}
+    _stats = {'hit': 0, 'miss': 0}
+
+    @staticmethod
+    def reset():
+        with PolicyCache._lock:
+            PolicyCache._entries = {}
+            PolicyCache._versions = {}
+            PolicyCache._stats = {'hit': 0, 'miss': 0}
+
+    ## arn -> DefaultVersionId, only valid for the current run
+    @staticmethod
+    def getVersion(arn):
+        return PolicyCache._versions.get(arn)
+
+    @staticmethod
+    def setVersion(arn, versionId):
+        with PolicyCache._lock:
+            PolicyCache._versions[arn] = versionId
+
+    @staticmethod
+    def get(arn, versionId):
+        with PolicyCache._lock:
+            entry = PolicyCache._entries.get((arn, versionId))
+            PolicyCache._stats['hit' if entry is not None else 'miss'] += 1
+            return entry
+
+    @staticmethod
+    def set(arn, versionId, document, verdict):
+        entry = {
+            'document': document,
+            'verdict': verdict
+        }
+        with PolicyCache._lock:
+            PolicyCache._entries[(arn, versionId)] = entry
+        return entry
+
+    @staticmethod
+    def getStats():
+        stats = dict(PolicyCache._stats)
+        stats['entries'] = len(PolicyCache._entries)
+        return stats
+
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return 0
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError:
+            return 0
+
+        if data.get('version') != PolicyCache.FILE_VERSION:
+            return 0
+
+        cnt = 0
+        with PolicyCache._lock:
+            for row in data.get('entries', []):
+                PolicyCache._entries[(row['arn'], row['versionId'])] = {
+                    'document': row['document'],
+                    'verdict': row['verdict']
+                }
+                cnt += 1
+        return cnt
+
+    @staticmethod
+    def save(path):
+        rows = []
+        with PolicyCache._lock:
+            for (arn, versionId), entry in PolicyCache._entries.items():
+                if not arn.startswith(PolicyCache.AWS_MANAGED_PREFIX):
+                    continue
+                rows.append({
+                    'arn': arn,
+                    'versionId': versionId,
+                    'document': entry['document'],
+                    'verdict': entry['verdict']
+                })
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with open(path, 'w') as f:
+            json.dump({'version': PolicyCache.FILE_VERSION, 'entries': rows}, f)
+        return len(rows)
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import cProfile
+import pstats
+import threading
+from contextlib import contextmanager
+
+## Opt-in (--profiling) instrumentation of a run.
+## - per (evaluator class, check): calls, wall time, exceptions and API calls
+## - per stage (collection, evaluation, reporting, pagebuilding): wall time and a cProfile
+##   dump. Each thread keeps one cProfile per stage and switches between them, so stages
+##   running inside the same worker thread are still kept apart.
+## Stage times are summed over threads, not wall-clock of the whole run.
+class Profiler:
+    STAGES = ['collection', 'evaluation', 'reporting', 'pagebuilding']
+
+    enabled = False
+    _lock = threading.Lock()
+    _local = threading.local()
+    _checks = {}
+    _stageTime = {}
+    _profiles = {}
+    _partial = False
+
+    @staticmethod
+    def enable():
+        Profiler.enabled = True
+
+    ## API calls are counted per thread, so a check can see how many calls it made
+    @staticmethod
+    def recordApiCall(**kwargs):
+        Profiler._local.apiCalls = getattr(Profiler._local, 'apiCalls', 0) + 1
+
+    @staticmethod
+    def apiCallCount():
+        return getattr(Profiler._local, 'apiCalls', 0)
+
+    @staticmethod
+    def attach(client):
+        client.meta.events.register('before-call', Profiler.recordApiCall)
+        return client
+
+    @staticmethod
+    def recordCheck(classname, check, elapsed, failed, apiCalls):
+        key = (classname, check)
+        with Profiler._lock:
+            stat = Profiler._checks.get(key)
+            if stat is None:
+                stat = Profiler._checks[key] = {'calls': 0, 'time': 0.0, 'exceptions': 0, 'apiCalls': 0}
+            stat['calls'] += 1
+            stat['time'] += elapsed
+            stat['exceptions'] += 1 if failed else 0
+            stat['apiCalls'] += apiCalls
+
+    @staticmethod
+    def addStageTime(stage, elapsed):
+        with Profiler._lock:
+            Profiler._stageTime[stage] = Profiler._stageTime.get(stage, 0.0) + elapsed
+
+    @staticmethod
+    def _profileFor(stage):
+        profiles = getattr(Profiler._local, 'profiles', None)
+        if profiles is None:
+            profiles = Profiler._local.profiles = {}
+
+        if stage not in profiles:
+            profiles[stage] = cProfile.Profile()
+            with Profiler._lock:
+                Profiler._profiles.setdefault(stage, []).append(profiles[stage])
+        return profiles[stage]
+
+    ## make <stage> the active cProfile of the current thread, returns the previous stage
+    @staticmethod
+    def switch(stage):
+        previous = getattr(Profiler._local, 'active', None)
+        if not Profiler.enabled or previous == stage:
+            return previous
+
+        if previous is not None:
+            Profiler._profileFor(previous).disable()
+
+        Profiler._local.active = stage
+        if stage is not None:
+            try:
+                Profiler._profileFor(stage).enable()
+            except ValueError:
+                ## newer Pythons allow only one active cProfile per process
+                Profiler._partial = True
+                Profiler._local.active = None
+        return previous
+
+    @staticmethod
+    @contextmanager
+    def stage(name):
+        if not Profiler.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        previous = Profiler.switch(name)
+        try:
+            yield
+        finally:
+            Profiler.switch(previous)
+            if name != 'evaluation':
+                Profiler.addStageTime(name, time.perf_counter() - start)
+
+    @staticmethod
+    def getSummary():
+        checks = []
+        evaluation = 0.0
+        for (classname, check), stat in Profiler._checks.items():
+            evaluation += stat['time']
+            checks.append({
+                'class': classname,
+                'check': check,
+                'calls': stat['calls'],
+                'time': round(stat['time'], 6),
+                'avg': round(stat['time'] / stat['calls'], 6),
+                'exceptions': stat['exceptions'],
+                'apiCalls': stat['apiCalls']
+            })
+        checks.sort(key=lambda c: c['time'], reverse=True)
+
+        stages = {k: round(v, 6) for k, v in Profiler._stageTime.items()}
+        stages['evaluation'] = round(evaluation, 6)
+        return {
+            'stages': stages,
+            'checks': checks,
+            'partialProfile': Profiler._partial
+        }
+
+    @staticmethod
+    def save(folder):
+        os.makedirs(folder, exist_ok=True)
+
+        for stage, profiles in Profiler._profiles.items():
+            stats = None
+            for p in profiles:
+                p.create_stats()
+                if not p.stats:
+                    continue
+                if stats is None:
+                    stats = pstats.Stats(p)
+                else:
+                    stats.add(p)
+
+            if stats is not None:
+                stats.dump_stats(folder + '/' + stage + '.pstats')
+
+        summary = Profiler.getSummary()
+        with open(folder + '/summary.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
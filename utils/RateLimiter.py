@@ -0,0 +1,144 @@
+import re
+import time
+import threading
+
+import botocore
+
+## Token bucket shared by every thread calling the same (service, [region,] operation family).
+## On a throttling response the rate is halved (AIMD); after a clean window without
+## throttling it ramps back up by 25% at a time, up to the configured rate.
+class TokenBucket:
+    CLEAN_WINDOW = 10
+    RAMP_FACTOR = 1.25
+    BACKOFF_FACTOR = 0.5
+    MIN_RATE = 0.5
+
+    def __init__(self, rate):
+        self.maxRate = float(rate)
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lastChange = self.updated
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.rate < self.maxRate and now - self.lastChange > self.CLEAN_WINDOW:
+            self.rate = min(self.maxRate, self.rate * self.RAMP_FACTOR)
+            self.lastChange = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def onThrottle(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.MIN_RATE, self.rate * self.BACKOFF_FACTOR)
+            self.tokens = min(self.tokens, 0)
+            self.lastChange = now
+
+class RateLimiter:
+    THROTTLING_CODES = [
+        'Throttling',
+        'ThrottlingException',
+        'ThrottledException',
+        'RequestThrottled',
+        'RequestThrottledException',
+        'TooManyRequestsException',
+        'RequestLimitExceeded',
+        'SlowDown'
+    ]
+
+    ## requests per second; IAM quota is account-wide so it is not split by region
+    DEFAULT_RATES = {
+        'iam': 15,
+        'sts': 20,
+        's3': 100,
+        's3control': 20,
+        'ec2': 50,
+        'rds': 20,
+        'resourcegroupstaggingapi': 10,
+        'default': 50
+    }
+    GLOBAL_SERVICES = ['iam', 'sts', 's3control']
+    READ_PREFIX = re.compile(r'^(Get|List|Describe|Head)')
+
+    enabled = True
+    _rates = dict(DEFAULT_RATES)
+    _lock = threading.Lock()
+    _buckets = {}
+
+    ## --ratelimit off | --ratelimit iam=20,s3=100
+    @staticmethod
+    def configure(text):
+        RateLimiter._rates = dict(RateLimiter.DEFAULT_RATES)
+        RateLimiter._buckets = {}
+        RateLimiter.enabled = True
+        if not text:
+            return
+
+        if str(text).lower() in ['off', 'false', 'no', '0']:
+            RateLimiter.enabled = False
+            return
+
+        for token in str(text).split(','):
+            if '=' not in token:
+                continue
+            service, rate = token.split('=', 1)
+            RateLimiter._rates[service.strip().lower()] = float(rate)
+
+    ## still throttled once botocore has used up its retries
+    @staticmethod
+    def isThrottling(e):
+        if not isinstance(e, botocore.exceptions.ClientError):
+            return False
+        return e.response.get('Error', {}).get('Code') in RateLimiter.THROTTLING_CODES
+
+    @staticmethod
+    def getFamily(operation):
+        return 'read' if RateLimiter.READ_PREFIX.match(operation) else 'write'
+
+    @staticmethod
+    def getBucket(service, region, operation):
+        region = 'global' if service in RateLimiter.GLOBAL_SERVICES else region
+        key = (service, region, RateLimiter.getFamily(operation))
+        bucket = RateLimiter._buckets.get(key)
+        if bucket is None:
+            with RateLimiter._lock:
+                bucket = RateLimiter._buckets.get(key)
+                if bucket is None:
+                    rate = RateLimiter._rates.get(service, RateLimiter._rates['default'])
+                    bucket = RateLimiter._buckets[key] = TokenBucket(rate)
+        return bucket
+
+    @staticmethod
+    def register(client):
+        region = client.meta.region_name or 'global'
+
+        def beforeCall(model=None, **kwargs):
+            if RateLimiter.enabled:
+                RateLimiter.getBucket(model.service_model.service_name, region, model.name).acquire()
+            return None
+
+        def needsRetry(response=None, operation=None, **kwargs):
+            if not RateLimiter.enabled or not response or operation is None:
+                return None
+            code = (response[1] or {}).get('Error', {}).get('Code')
+            if code in RateLimiter.THROTTLING_CODES:
+                RateLimiter.getBucket(operation.service_model.service_name, region, operation.name).onThrottle()
+            return None
+
+        client.meta.events.register('before-call', beforeCall)
+        client.meta.events.register('needs-retry', needsRetry)
+        return client
@@ -0,0 +1,91 @@
+import os
+import json
+import hashlib
+import threading
+
+## Per-account state of the previous scan: resource key -> (fingerprint, results).
+## A resource whose fingerprint is unchanged reuses its previous results instead of being
+## re-evaluated. Resources of a scanned service that were not seen in this run are dropped
+## on save, so deleted resources do not linger in the file.
+class ScanState:
+    FILE_VERSION = 2
+
+    enabled = False
+    _lock = threading.Lock()
+    _previous = {}
+    _current = {}
+    _stats = {'reused': 0, 'evaluated': 0}
+
+    @staticmethod
+    def reset():
+        with ScanState._lock:
+            ScanState.enabled = False
+            ScanState._previous = {}
+            ScanState._current = {}
+            ScanState._stats = {'reused': 0, 'evaluated': 0}
+
+    @staticmethod
+    def getAccountId(stsClient):
+        return stsClient.get_caller_identity().get('Account')
+
+    @staticmethod
+    def getPath(folder, accountId):
+        return os.path.join(folder, str(accountId) + '.json')
+
+    @staticmethod
+    def fingerprint(parts):
+        raw = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get(service, key, fingerprint):
+        entry = ScanState._previous.get(service, {}).get(key)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return entry['results']
+
+    @staticmethod
+    def set(service, key, fingerprint, results, reused=False):
+        with ScanState._lock:
+            ScanState._current.setdefault(service, {})[key] = {
+                'fingerprint': fingerprint,
+                'results': results
+            }
+            ScanState._stats['reused' if reused else 'evaluated'] += 1
+
+    @staticmethod
+    def getStats():
+        return dict(ScanState._stats)
+
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return 0
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError:
+            return 0
+
+        if data.get('version') != ScanState.FILE_VERSION:
+            return 0
+
+        with ScanState._lock:
+            ScanState._previous = data.get('services', {})
+        return sum(len(v) for v in ScanState._previous.values())
+
+    @staticmethod
+    def save(path):
+        ## services not scanned in this run keep their previous state
+        with ScanState._lock:
+            services = dict(ScanState._previous)
+            services.update({service: dict(entries) for service, entries in ScanState._current.items()})
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with open(path, 'w') as f:
+            json.dump({'version': ScanState.FILE_VERSION, 'services': services}, f, default=str)
+        return sum(len(v) for v in services.values())
@@ -0,0 +1,103 @@
+import importlib
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.Config import Config
+from utils.Tools import _warn
+from utils.Profiler import Profiler
+
+## Expand --services x --region into scan units and run Service.advise() on a bounded pool.
+## Threads rather than processes: boto3 clients & Config cache are not picklable,
+## and the work is dominated by network latency anyway.
+class Scheduler:
+    GLOBAL_REGION = 'GLOBAL'
+
+    def __init__(self, services, regions, concurrency=1):
+        self.services = services
+        self.regions = regions
+        self.concurrency = max(1, int(concurrency))
+
+    @staticmethod
+    def parseList(val):
+        arr = []
+        for v in str(val).split(','):
+            v = v.strip()
+            if v and v not in arr:
+                arr.append(v)
+        return arr
+
+    def getServiceClass(self, service):
+        className = service.capitalize()
+        try:
+            module = importlib.import_module('services.' + service + '.' + className)
+        except ModuleNotFoundError:
+            return None
+
+        return getattr(module, className, None)
+
+    def buildJobs(self):
+        jobs = []
+        for service in self.services:
+            ServiceClass = self.getServiceClass(service)
+            if ServiceClass is None:
+                _warn(" Service <{}> is not supported yet, skipping".format(service))
+                continue
+
+            ## Global services (e.g: IAM) are scanned once, reported under GLOBAL
+            if service in Config.GLOBAL_SERVICES:
+                jobs.append((service, self.GLOBAL_REGION, ServiceClass, self.regions[0]))
+                continue
+
+            for region in self.regions:
+                jobs.append((service, region, ServiceClass, region))
+
+        return jobs
+
+    def _runJob(self, job):
+        service, reportRegion, ServiceClass, region = job
+        print('... ({}) scanning {}'.format(service.upper(), reportRegion))
+        with Profiler.stage('collection'):
+            o = ServiceClass(region)
+            return o.advise()
+
+    ## callback(service, {region: objs}) is invoked from the calling thread as soon as
+    ## every region of that service has completed, so reporting overlaps remaining scans
+    def run(self, callback=None):
+        jobs = self.buildJobs()
+
+        pending = {}
+        regionOrder = {}
+        for service, reportRegion, _, _ in jobs:
+            pending[service] = pending.get(service, 0) + 1
+            regionOrder.setdefault(service, []).append(reportRegion)
+
+        collected = {service: {} for service in pending}
+        output = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self._runJob, job): job for job in jobs}
+            for future in as_completed(futures):
+                service, reportRegion, _, _ = futures[future]
+                try:
+                    objs = future.result()
+                except Exception:
+                    _warn(" {} on {} failed".format(service, reportRegion))
+                    traceback.print_exc()
+                    objs = {}
+
+                collected[service][reportRegion] = objs or {}
+                pending[service] -= 1
+                if pending[service] > 0:
+                    continue
+
+                ## keep region order as requested on CLI, independent of completion order
+                output[service] = {r: collected[service][r] for r in regionOrder[service]}
+                if callback is None:
+                    continue
+                ## a failing reporter must not abort the scans still running
+                try:
+                    callback(service, output[service])
+                except Exception:
+                    _warn(" reporting {} failed".format(service))
+                    traceback.print_exc()
+
+        return {service: output[service] for service in collected}
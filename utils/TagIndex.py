@@ -0,0 +1,50 @@
+import threading
+
+from utils.Cache import Cache
+from utils.ClientFactory import ClientFactory
+
+## ARN -> {Key: Value} for every tagged resource of a region, from one paginated
+## resourcegroupstaggingapi:get_resources sweep shared by all services of that region.
+## The tag filter is pushed down as TagFilters, so only candidate resources are returned.
+class TagIndex:
+    PAGE_SIZE = 100
+
+    _lock = threading.Lock()
+    _regionLocks = {}
+
+    @staticmethod
+    def toTagFilters(tagFilter):
+        return [{'Key': key, 'Values': sorted(values)} if values else {'Key': key} for key, values in tagFilter.items()]
+
+    @staticmethod
+    def build(region, tagFilter):
+        client = ClientFactory.get('resourcegroupstaggingapi', region)
+        args = {'ResourcesPerPage': TagIndex.PAGE_SIZE}
+        if tagFilter:
+            args['TagFilters'] = TagIndex.toTagFilters(tagFilter)
+
+        index = {}
+        paginator = client.get_paginator('get_resources')
+        for page in paginator.paginate(**args):
+            for res in page.get('ResourceTagMappingList', []):
+                index[res['ResourceARN']] = {t['Key']: t['Value'] for t in res.get('Tags', [])}
+        return index
+
+    @staticmethod
+    def get(region, tagFilter):
+        ns = Cache.namespace('tags')
+        index = ns.get(region)
+        if index is not None:
+            return index
+
+        with TagIndex._lock:
+            regionLock = TagIndex._regionLocks.setdefault(region, threading.Lock())
+
+        ## one sweep per region, other services of the same region wait for it
+        with regionLock:
+            index = ns.get(region)
+            if index is None:
+                print('... (Tagging) indexing tagged resources in ' + region)
+                index = TagIndex.build(region, tagFilter)
+                ns.set(region, index)
+        return index
@@ -2,7 +2,9 @@ import boto3
 import re
 
 from pprint import pprint
+from functools import lru_cache
 from .Config import Config
+from .InstanceSpec import InstanceSpec
 
 def _pr(s):
     pprint(s)
@@ -10,12 +12,14 @@ def _pr(s):
 def _warn(s):
     print("[\033[1;41m__!! WARNING !!__\033[0m]" + s)
     
-def aws_parseInstanceFamily(instanceFamilyInString):
-    CURRENT_REGION = Config.CURRENT_REGION
-    
+INSTANCE_FAMILY_PATTERN = re.compile(r"([a-zA-Z]+)(\d+)([a-zA-Z]*)")
+
+## 'db.r6g.xlarge' -> ('r6g', 'xlarge', ('r', '6', 'g')), None if not an instance type
+@lru_cache(maxsize=4096)
+def _splitInstanceFamily(instanceFamilyInString):
     arr = instanceFamilyInString.split('.')
     if len(arr) > 3 or len(arr) == 1:
-        return instanceFamilyInString
+        return None
         
     if len(arr) == 3 and arr[0].lower() == "db":
         p = arr[1]
@@ -24,42 +28,30 @@ def aws_parseInstanceFamily(instanceFamilyInString):
         p = arr[0]
         s = arr[1]
         
-    patterns = r"([a-zA-Z]+)(\d+)([a-zA-Z]*)"
-    output = re.search(patterns, p)
+    output = INSTANCE_FAMILY_PATTERN.search(p)
+    if output is None:
+        return None
+    return p, s, output.groups()
     
-    cpu = memory = 0
+## specification comes from the InstanceSpec catalog, use InstanceSpec.prefetch()
+## with all types first when sizing many resources
+def aws_parseInstanceFamily(instanceFamilyInString):
+    parsed = _splitInstanceFamily(instanceFamilyInString)
+    if parsed is None:
+        return instanceFamilyInString
     
-    family = p+'.'+s
-    CACHE_KEYWORD = 'INSTANCE_SPEC::' + family
-    spec = Config.get(CACHE_KEYWORD, [])
-    if not spec:
-        ec2c = boto3.client('ec2', region_name=CURRENT_REGION)
-        
-        print(family)
-        resp = ec2c.describe_instance_types(InstanceTypes=[family])
-        
-        iType = resp.get('InstanceTypes')
-        if iType:
-            info = iType[0]
-            cpu = info['VCpuInfo']['DefaultVCpus']
-            memory = round(info['MemoryInfo']['SizeInMiB']/1024, 2)
-        
-        spec = {
-            'vcpu' : cpu,
-            'memoryInGiB' : memory
-        }
-        
-        Config.set(CACHE_KEYWORD, spec)
+    p, s, groups = parsed
+    spec = InstanceSpec.get(p+'.'+s)
     
     result = {
         "full": instanceFamilyInString,
         "prefix": p,
         "suffix": s,
-        "specification": spec,
+        "specification": dict(spec),
         "prefixDetail": {
-            "family": output.group(1),
-            "version": output.group(2),
-            "attributes": output.group(3),
+            "family": groups[0],
+            "version": groups[1],
+            "attributes": groups[2],
         }
     }
 
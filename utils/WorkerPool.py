@@ -0,0 +1,32 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.Config import Config
+
+## Bounded, order-preserving worker pool for evaluating resources.
+## - at most (workers * 2) items are in flight, so large inputs are never fully queued
+## - results are yielded in the same order as the input
+## Throttling is not retried here: botocore retries the single call that was throttled
+## and RateLimiter slows down the callers, re-running a whole item would repeat its
+## earlier calls as well.
+class WorkerPool:
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = Config.get('workers', 1)
+        self.workers = max(1, int(workers))
+
+    def map(self, fn, items):
+        if self.workers == 1:
+            for item in items:
+                yield fn(item)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            window = deque()
+            for item in items:
+                window.append(executor.submit(fn, item))
+                if len(window) >= self.workers * 2:
+                    yield window.popleft().result()
+
+            while window:
+                yield window.popleft().result()